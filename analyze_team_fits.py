@@ -1,89 +1,68 @@
 import pandas as pd
+import sys
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sqlalchemy import create_engine
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import PolynomialFeatures
-from sklearn.pipeline import make_pipeline
-from sklearn.model_selection import cross_val_score, KFold
+from closing_data import load
+from sklearn.model_selection import KFold
+from joblib import Parallel, delayed
 import os
 
 # CONFIG
-DB_URL = 'sqlite:///nba_analysis.db'
 # Include Regular Season, Playoffs, Play-In
-TARGET_SEASON_IDS = "('22024', '42024', '52024')"
+TARGET_SEASON_IDS = ('22024', '42024', '52024')
 OUTPUT_DIR = 'reports'
 
-def get_data():
-    engine = create_engine(DB_URL)
-    print(f"   Fetching 2024-25 data...")
-    
-    query = f"""
-    WITH q3_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 3 
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    ),
-    final_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 4
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    )
-    SELECT 
-        g.game_id,
-        t_home.abbreviation as home_team,
-        t_away.abbreviation as away_team,
-        q3.score_home as q3_h,
-        q3.score_away as q3_a,
-        final.score_home as f_h,
-        final.score_away as f_a
-    FROM games g
-    JOIN q3_scores q3 ON g.game_id = q3.game_id
-    JOIN final_scores final ON g.game_id = final.game_id
-    JOIN teams t_home ON g.home_team_id = t_home.team_id
-    JOIN teams t_away ON g.away_team_id = t_away.team_id
-    WHERE g.season_id IN {TARGET_SEASON_IDS}
+def cv_poly_mse(V, y, degree, cv):
     """
-    
-    try:
-        raw_df = pd.read_sql(query, engine)
-        if raw_df.empty: return pd.DataFrame()
-
-        cols = ['q3_h', 'q3_a', 'f_h', 'f_a']
-        for c in cols: raw_df[c] = pd.to_numeric(raw_df[c], errors='coerce')
-        
-        raw_df[cols] = raw_df.groupby('game_id')[cols].ffill()
-        raw_df = raw_df.dropna()
+    K-Fold MSE of a polynomial fit of the given degree.
+    V is a precomputed Vandermonde matrix (highest power first), so each
+    degree just uses its last (degree + 1) columns instead of rebuilding features.
+    """
+    A = V[:, -(degree + 1):]
+    fold_mse = []
+    for train, test in cv.split(A):
+        coeffs, *_ = np.linalg.lstsq(A[train], y[train], rcond=None)
+        fold_mse.append(np.mean((A[test] @ coeffs - y[test]) ** 2))
+    return np.mean(fold_mse)
 
-        raw_df['Q3_Margin'] = raw_df['q3_h'] - raw_df['q3_a']
-        raw_df['Final_Margin'] = raw_df['f_h'] - raw_df['f_a']
+def fit_one_team(team, team_df):
+    """Finds the best polynomial degree (1-3) for one team. Returns None if too few games."""
+    # Skip teams with too little data to be significant
+    if len(team_df) < 10:
+        return None
         
-        # Stack Data
-        home_df = raw_df[['home_team', 'Q3_Margin', 'Final_Margin']].copy()
-        home_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
-        
-        away_df = raw_df[['away_team', 'Q3_Margin', 'Final_Margin']].copy()
-        away_df['Q3_Lead'] = away_df['Q3_Margin'] * -1
-        away_df['Final_Result'] = away_df['Final_Margin'] * -1
-        
-        # --- FIX: Select 'away_team' BEFORE renaming ---
-        away_df = away_df[['away_team', 'Q3_Lead', 'Final_Result']]
-        away_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
+    y = team_df['Final_Result'].to_numpy()
+    team_result = {'Team': team, 'Games': len(team_df)}
+    
+    # 5-Fold Cross Validation (or less if not enough data)
+    splits = min(5, len(team_df) // 2)
+    if splits < 2: splits = 2
+    cv = KFold(n_splits=splits, shuffle=True, random_state=42)
+    
+    best_mse = float('inf')
+    best_degree = 1
+    
+    # Columns: x^3, x^2, x, 1 (built once, shared by every degree & fold)
+    V = np.vander(team_df['Q3_Lead'].to_numpy(), 4)
+    
+    # Test Degrees 1, 2, 3
+    for d in [1, 2, 3]:
+        mse = cv_poly_mse(V, y, d, cv)
         
-        return pd.concat([home_df, away_df], ignore_index=True)
+        team_result[f'MSE_D{d}'] = mse
         
-    except Exception as e:
-        print(f"Error: {e}")
-        return pd.DataFrame()
+        # We look for the lowest error
+        if mse < best_mse:
+            best_mse = mse
+            best_degree = d
+    
+    team_result['Best_Degree'] = best_degree
+    return team_result
 
 def analyze_team_fits():
     print("--- 🔬 ANALYZING TEAM REGRESSION TYPES ---")
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    df = get_data()
+    df = load(TARGET_SEASON_IDS)
     if df.empty:
         print("No data found.")
         return
@@ -91,48 +70,14 @@ def analyze_team_fits():
     teams = sorted(df['Team'].unique())
     print(f"   Testing models for {len(teams)} teams...")
     
-    results = []
-    
-    for team in teams:
-        team_df = df[df.Team == team]
-        X = team_df[['Q3_Lead']].values
-        y = team_df['Final_Result'].values
-        
-        # Skip teams with too little data to be significant
-        if len(team_df) < 10:
-            continue
-            
-        team_result = {'Team': team, 'Games': len(team_df)}
-        
-        # 5-Fold Cross Validation (or less if not enough data)
-        splits = min(5, len(team_df) // 2)
-        if splits < 2: splits = 2
-        cv = KFold(n_splits=splits, shuffle=True, random_state=42)
-        
-        best_mse = float('inf')
-        best_degree = 1
-        
-        # Test Degrees 1, 2, 3
-        for d in [1, 2, 3]:
-            model = make_pipeline(PolynomialFeatures(d), LinearRegression())
-            # Scoring is neg_mean_squared_error, so we negate it back to positive MSE
-            scores = cross_val_score(model, X, y, scoring='neg_mean_squared_error', cv=cv)
-            mse = -scores.mean()
-            
-            team_result[f'MSE_D{d}'] = mse
-            
-            # We look for the lowest error
-            if mse < best_mse:
-                best_mse = mse
-                best_degree = d
-        
-        team_result['Best_Degree'] = best_degree
-        results.append(team_result)
-        
-        # Progress dot
-        print(".", end="", flush=True)
+    # Each team's cross-validation is independent, so run them side by side.
+    # Threads are enough here: the work is in LAPACK, which releases the GIL,
+    # and we avoid pickling the DataFrame out to worker processes.
+    results = Parallel(n_jobs=-1, prefer='threads')(
+        delayed(fit_one_team)(team, team_df) for team, team_df in df.groupby('Team', observed=True)
+    )
+    results = [r for r in results if r is not None]
     
-    print("\n")
     results_df = pd.DataFrame(results)
     
     # Save Results
@@ -151,6 +96,13 @@ def analyze_team_fits():
     complex_teams = results_df[results_df['Best_Degree'] > 1]['Team'].tolist()
     print(", ".join(complex_teams))
 
+    if '--no-plot' in sys.argv:
+        return
+
+    # Plotting libraries are only imported when we actually draw charts
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # --- VISUALIZATION ---
     plt.figure(figsize=(10, 6))
     sns.countplot(x='Best_Degree', data=results_df, palette='viridis')
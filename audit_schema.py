@@ -1,5 +1,6 @@
 import sys
-from sqlalchemy import create_engine, inspect
+from collections import defaultdict
+from db_config import open_engine
 # Import all your models to check their definitions
 from models import (
     Base, Team, Player, Game, PlayerGameStats, PlayByPlay, 
@@ -12,8 +13,17 @@ def audit_schema():
     print(f"🕵️  Auditing Database Schema against Models...")
     print(f"    Database: {DB_URL}")
     
-    engine = create_engine(DB_URL)
-    inspector = inspect(engine)
+    engine = open_engine(DB_URL)
+    
+    # Read every table's columns in one query instead of a PRAGMA per table
+    db_schema = defaultdict(set)
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(
+            "SELECT m.name, p.name FROM sqlite_master m "
+            "JOIN pragma_table_info(m.name) p WHERE m.type = 'table'"
+        ).fetchall()
+    for table, column in rows:
+        db_schema[table].add(column)
     
     # List of (Model Class, Table Name) to check
     models_to_check = [
@@ -35,14 +45,14 @@ def audit_schema():
         print(f"\n📋 Checking table: '{table_name}'...")
         
         # 1. Check if table exists
-        if not inspector.has_table(table_name):
+        if table_name not in db_schema:
             print(f"   ❌ CRITICAL: Table '{table_name}' does not exist.")
             issues_found += 1
             tables_to_fix.append(table_name)
             continue
             
         # 2. Get actual columns in the .db file
-        db_columns = [c['name'] for c in inspector.get_columns(table_name)]
+        db_columns = db_schema[table_name]
         
         # 3. Get expected columns from models.py
         model_columns = [c.name for c in model_cls.__table__.columns]
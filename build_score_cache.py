@@ -0,0 +1,133 @@
+from sqlalchemy import inspect, text
+from db_config import open_engine
+
+# CONFIG
+DB_URL = 'sqlite:///nba_analysis.db'
+CACHE_TABLE = 'game_q3_final_scores'
+MATCHUP_CACHE_TABLE = 'player_matchups_enriched'
+
+# The expensive part of every closing-ability query: finding the last event
+# of Q3 and Q4 for each game. We run it once here and persist the result so
+# the analysis scripts only have to join a small (one row per game) table.
+#
+# Both periods come out of a single pass over play_by_play: ROW_NUMBER picks
+# the last event per (game, period) and the CASE pivot folds Q3 and Q4 into
+# one row per game. Events without a score (e.g. some End of Period rows) are
+# skipped, so the snapshot is the last known score in the period. Those are
+# NULL in INTEGER score columns and '' in databases that still store the
+# scores as text; `<> ''` drops both (NULL never compares true, and an integer
+# never equals a string).
+SCORE_QUERY = """
+WITH snaps AS (
+    SELECT game_id, period, score_home, score_away,
+           ROW_NUMBER() OVER (PARTITION BY game_id, period ORDER BY event_num DESC) as rn
+    FROM play_by_play
+    WHERE period IN (3, 4)
+      AND score_home <> '' AND score_away <> ''
+)
+SELECT
+    game_id,
+    MAX(CASE WHEN period = 3 THEN score_home END) as q3_h,
+    MAX(CASE WHEN period = 3 THEN score_away END) as q3_a,
+    MAX(CASE WHEN period = 4 THEN score_home END) as f_h,
+    MAX(CASE WHEN period = 4 THEN score_away END) as f_a
+FROM snaps
+WHERE rn = 1
+GROUP BY game_id
+HAVING COUNT(*) = 2
+"""
+
+# Covering index: the whole score lookup is served from this btree,
+# without touching the play_by_play rows themselves.
+PBP_SCORE_INDEX_NAME = 'ix_pbp_gid_period_evnum'
+PBP_SCORE_INDEX = f"""
+CREATE INDEX IF NOT EXISTS {PBP_SCORE_INDEX_NAME}
+ON play_by_play(game_id, period, event_num DESC, score_home, score_away)
+"""
+
+# Every closing-data query filters games by season before joining the scores.
+# Same name SQLAlchemy gives the index=True column in models.py, so fresh and
+# existing databases end up with one index, not two.
+GAMES_SEASON_INDEX = """
+CREATE INDEX IF NOT EXISTS ix_games_season_id ON games(season_id)
+"""
+
+# player_matchups only knows the two player IDs. Every matchup report needs
+# both players' teams (to label the defender and drop teammate "matchups"),
+# which costs two joins into player_game_stats. We do those joins once here.
+MATCHUP_QUERY = """
+SELECT
+    m.game_id,
+    m.off_player_id,
+    pgs_off.team_id as off_team_id,
+    m.def_player_id,
+    pgs_def.team_id as def_team_id,
+    m.matchup_minutes,
+    m.points_allowed,
+    m.matchup_ast,
+    m.matchup_tov,
+    m.matchup_blk
+FROM player_matchups m
+JOIN player_game_stats pgs_off
+  ON m.off_player_id = pgs_off.player_id
+  AND m.game_id = pgs_off.game_id
+JOIN player_game_stats pgs_def
+  ON m.def_player_id = pgs_def.player_id
+  AND m.game_id = pgs_def.game_id
+"""
+
+def build_score_cache(engine):
+    """
+    (Re)builds the game_q3_final_scores table from play_by_play.
+    Run this after ingesting new games so the analysis scripts see them.
+    """
+    print(f"   Building '{CACHE_TABLE}' from play_by_play...")
+    with engine.begin() as conn:
+        conn.execute(text(PBP_SCORE_INDEX))
+        conn.execute(text(GAMES_SEASON_INDEX))
+        conn.execute(text(f"DROP TABLE IF EXISTS {CACHE_TABLE}"))
+        conn.execute(text(f"CREATE TABLE {CACHE_TABLE} AS {SCORE_QUERY}"))
+        conn.execute(text(f"CREATE INDEX ix_gqfs_game_id ON {CACHE_TABLE}(game_id)"))
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {CACHE_TABLE}")).scalar()
+    print(f"   ✅ Cached Q3/Final scores for {count:,} games.")
+
+def ensure_score_cache(engine):
+    """Builds the score cache only if it doesn't exist yet."""
+    if not inspect(engine).has_table(CACHE_TABLE):
+        build_score_cache(engine)
+
+def build_matchup_cache(engine):
+    """
+    (Re)builds the player_matchups_enriched table (matchups + both players' teams).
+    Run this after ingesting new games so check_db sees them.
+    """
+    print(f"   Building '{MATCHUP_CACHE_TABLE}' from player_matchups...")
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE IF EXISTS {MATCHUP_CACHE_TABLE}"))
+        conn.execute(text(f"CREATE TABLE {MATCHUP_CACHE_TABLE} AS {MATCHUP_QUERY}"))
+        conn.execute(text(
+            f"CREATE INDEX ix_pme_off_player_def_team ON {MATCHUP_CACHE_TABLE}(off_player_id, def_team_id)"
+        ))
+        count = conn.execute(text(f"SELECT COUNT(*) FROM {MATCHUP_CACHE_TABLE}")).scalar()
+    print(f"   ✅ Cached {count:,} enriched matchup rows.")
+
+def ensure_matchup_cache(engine):
+    """Builds the matchup cache only if it doesn't exist yet."""
+    if not inspect(engine).has_table(MATCHUP_CACHE_TABLE):
+        build_matchup_cache(engine)
+
+def refresh_stats(engine):
+    """
+    Runs ANALYZE so the query planner (and the row-count estimates in
+    check_db/debug_counts, read from sqlite_stat1) reflect the latest data.
+    """
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print("   ✅ Refreshed planner statistics.")
+
+if __name__ == "__main__":
+    # Running the script directly always forces a rebuild
+    engine = open_engine(DB_URL)
+    build_score_cache(engine)
+    build_matchup_cache(engine)
+    refresh_stats(engine)
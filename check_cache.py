@@ -0,0 +1,34 @@
+import os
+import sys
+import subprocess
+from parquet_cache import cache_path
+from analyze_closing_24_25 import TARGET_SEASON_ID
+
+# CONFIG
+SCRIPT = 'analyze_closing_24_25.py'
+
+def check_closing_cache():
+    """
+    Runs the closing analysis twice and confirms the second run read its
+    closing data from the Parquet cache. A cache miss rewrites the file, so
+    it must still have the same mtime after the second run.
+    """
+    path = cache_path(f"closing_{(TARGET_SEASON_ID,)}")
+    print(f"--- 🗄️ PARQUET CACHE CHECK ({SCRIPT}) ---")
+
+    stamps = []
+    for run in (1, 2):
+        print(f"   Run {run}...")
+        subprocess.run([sys.executable, SCRIPT], check=True, capture_output=True)
+        stamps.append(os.stat(path).st_mtime_ns if os.path.exists(path) else None)
+
+    if stamps[0] is None:
+        print(f"❌ No cache file was written ({path}). Is there closing data for {TARGET_SEASON_ID}?")
+    elif stamps[1] == stamps[0]:
+        print(f"✅ Second run was served from {path}.")
+    else:
+        print(f"❌ Second run rebuilt {path} instead of reading it.")
+        print("   (Was something writing to the database at the same time?)")
+
+if __name__ == "__main__":
+    check_closing_cache()
@@ -1,5 +1,5 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from db_config import open_engine
 from dotenv import load_dotenv
 import os
 
@@ -7,42 +7,52 @@ def verify_scores():
     # 1. Connect to Database
     load_dotenv()
     db_str = os.getenv("DATABASE_URL", "sqlite:///nba_analysis.db")
-    engine = create_engine(db_str)
+    engine = open_engine(db_str)
 
     print(f"Checking data in: {db_str}...\n")
 
-    # 2. Query raw data (Just getting the columns we care about)
-    # We order by GAME_ID to ensure the two team rows stay together
+    # 2. Query the last 10 team rows, already paired up
+    # Each game is stored as two team rows. The rows are limited first (one
+    # ordered pass, like a plain LIMIT), then self-joined in SQL so every
+    # result row is one full game (g2 is NULL if the other row is missing).
     query = """
-    SELECT GAME_ID, GAME_DATE, MATCHUP, PTS 
-    FROM games 
-    ORDER BY GAME_ID DESC 
-    LIMIT 10
+    WITH last AS (
+        SELECT GAME_ID, GAME_DATE, MATCHUP, PTS
+        FROM games
+        ORDER BY GAME_ID DESC
+        LIMIT 10
+    )
+    SELECT
+        g1.GAME_ID, g1.GAME_DATE,
+        g1.MATCHUP AS MATCHUP_1, g2.MATCHUP AS MATCHUP_2,
+        g1.PTS AS PTS_1, g2.PTS AS PTS_2
+    FROM last g1
+    LEFT JOIN last g2
+      ON g2.GAME_ID = g1.GAME_ID AND g2.MATCHUP > g1.MATCHUP
+    WHERE g1.MATCHUP = (SELECT MIN(MATCHUP) FROM last WHERE GAME_ID = g1.GAME_ID)
+    ORDER BY g1.GAME_ID DESC
     """
     
-    df = pd.read_sql(query, engine)
+    with engine.connect() as conn:
+        result = conn.exec_driver_sql(query)
+        df = pd.DataFrame.from_records(result.fetchall(), columns=list(result.keys()))
 
     print("--- RAW DATABASE VIEW (What is actually saved) ---")
     print(df)
     print("\n" + "="*50 + "\n")
 
     print("--- SCOREBOARD VIEW (Reconstructed by Game ID) ---")
-    # 3. Logic to pair them up
-    # We group by GAME_ID to bundle the two rows together
-    grouped = df.groupby('GAME_ID')
-
-    for game_id, group in grouped:
+    for game in df.itertuples(index=False):
         # Check if we have both sides of the game
-        if len(group) == 2:
-            team1 = group.iloc[0]
-            team2 = group.iloc[1]
-            
-            # Simple string formatting to look like a scoreboard
-            print(f"Date: {team1['GAME_DATE']} | {team1['MATCHUP']} vs {team2['MATCHUP']}")
-            print(f"Score: {team1['PTS']} - {team2['PTS']}")
-            print("-" * 30)
-        else:
-            print(f"Game {game_id} is incomplete (found {len(group)} rows).")
+        if pd.isna(game.MATCHUP_2):
+            print(f"Game {game.GAME_ID} is incomplete (found 1 row).")
+            continue
+        
+        # Simple string formatting to look like a scoreboard
+        # (PTS_2 is a float because the LEFT JOIN column can hold NULLs)
+        print(f"Date: {game.GAME_DATE} | {game.MATCHUP_1} vs {game.MATCHUP_2}")
+        print(f"Score: {game.PTS_1} - {int(game.PTS_2)}")
+        print("-" * 30)
 
 if __name__ == "__main__":
-    verify_scores()
\ No newline at end of file
+    verify_scores()
@@ -0,0 +1,138 @@
+import functools
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from db_config import open_engine
+from build_score_cache import ensure_score_cache
+from parquet_cache import parquet_cache
+
+# CONFIG
+DB_URL = 'sqlite:///nba_analysis.db'
+
+# One row per scored game, margins from the home side. Older databases store
+# the scores as strings in play_by_play, so they're cast here; games missing a
+# Q3/Final snapshot can't be scored and are left out.
+GAME_MARGINS_SQL = """
+    SELECT
+        t_home.abbreviation as home_team,
+        t_away.abbreviation as away_team,
+        CAST(s.q3_h AS REAL) - CAST(s.q3_a AS REAL) as q3_margin,
+        CAST(s.f_h AS REAL) - CAST(s.f_a AS REAL) as final_margin
+    FROM games g
+    JOIN game_q3_final_scores s ON g.game_id = s.game_id
+    JOIN teams t_home ON g.home_team_id = t_home.team_id
+    JOIN teams t_away ON g.away_team_id = t_away.team_id
+    WHERE g.season_id IN :season_ids
+      AND s.q3_h IS NOT NULL AND s.q3_a IS NOT NULL
+      AND s.f_h IS NOT NULL AND s.f_a IS NOT NULL
+"""
+
+# Stack Data: home rows first, then away rows with the signs flipped.
+# SQLite emits the tidy long frame directly; pandas never sees the wide one.
+STACKED_SQL = """
+    SELECT home_team as Team, q3_margin as Q3_Lead, final_margin as Final_Result FROM game_margins
+    UNION ALL
+    SELECT away_team, -q3_margin, -final_margin FROM game_margins
+"""
+
+CLOSING_QUERY = f"WITH game_margins AS ({GAME_MARGINS_SQL})\n{STACKED_SQL}"
+
+# Column types for CLOSING_QUERY
+CLOSING_DTYPE = [('Team', 'U10'), ('Q3_Lead', 'f8'), ('Final_Result', 'f8')]
+
+def read_closing_scores(engine, query, params):
+    """
+    Runs a closing-data query and builds the DataFrame from a typed NumPy
+    array, skipping pd.read_sql's per-row object conversion and dtype inference.
+    Values are passed as bound parameters (list/tuple values expand for IN clauses),
+    so the SQL text stays constant and SQLite can reuse the prepared statement.
+    """
+    stmt = text(query).bindparams(
+        *[bindparam(k, expanding=isinstance(v, (list, tuple))) for k, v in params.items()]
+    )
+    with engine.connect() as conn:
+        rows = conn.execute(stmt, params).fetchall()
+    arr = np.fromiter((tuple(r) for r in rows), dtype=CLOSING_DTYPE, count=len(rows))
+    return pd.DataFrame(arr)
+
+def _fetch_closing_data(season_ids):
+    engine = open_engine(DB_URL)
+    ensure_score_cache(engine)
+    print(f"   Fetching closing data for Season IDs {season_ids}...")
+
+    try:
+        df = read_closing_scores(engine, CLOSING_QUERY, {'season_ids': season_ids})
+        # Team is categorical so every groupby('Team') works on small integer
+        # codes instead of hashing the abbreviation strings again.
+        df['Team'] = pd.Categorical(df['Team'])
+        return df
+
+    except Exception as e:
+        print(f"Error: {e}")
+        return pd.DataFrame()
+
+# Team-level closing rankings, aggregated entirely in SQLite. The league
+# baseline is a single-feature OLS (Final_Result ~ Q3_Lead), which only needs
+# five running sums, so the stacked team-games never leave the database.
+RANKINGS_QUERY = f"""
+WITH game_margins AS ({GAME_MARGINS_SQL}),
+stacked AS ({STACKED_SQL}),
+sums AS (
+    SELECT COUNT(*) as n, SUM(Q3_Lead) as sx, SUM(Final_Result) as sy,
+           SUM(Q3_Lead * Final_Result) as sxy, SUM(Q3_Lead * Q3_Lead) as sxx
+    FROM stacked
+),
+fit AS (
+    SELECT n, (n * sxy - sx * sy) / (n * sxx - sx * sx) as slope, sx, sy
+    FROM sums
+)
+SELECT
+    st.Team,
+    AVG(st.Final_Result - (fit.slope * st.Q3_Lead + (fit.sy - fit.slope * fit.sx) / fit.n)) as Points_Gained_In_4th,
+    fit.slope,
+    (fit.sy - fit.slope * fit.sx) / fit.n as intercept,
+    fit.n
+FROM stacked st, fit
+GROUP BY st.Team
+ORDER BY Points_Gained_In_4th DESC
+"""
+
+def load_rankings(season_ids=('22024',)):
+    """
+    Returns (rankings, slope, intercept, n) for the given season IDs, where
+    rankings is each team's average points gained in the 4th vs. the league
+    OLS baseline (best first), and n is the number of team-games it used.
+    """
+    engine = open_engine(DB_URL)
+    ensure_score_cache(engine)
+    print(f"   Ranking closers for Season IDs {season_ids}...")
+
+    try:
+        with engine.connect() as conn:
+            stmt = text(RANKINGS_QUERY).bindparams(bindparam('season_ids', expanding=True))
+            rows = conn.execute(stmt, {'season_ids': list(season_ids)}).fetchall()
+    except Exception as e:
+        print(f"Error: {e}")
+        rows = []
+
+    if not rows:
+        return pd.Series(dtype=float, name='Points_Gained_In_4th'), np.nan, np.nan, 0
+
+    teams, gained, slopes, intercepts, ns = zip(*rows)
+    rankings = pd.Series(gained, index=pd.Index(teams, name='Team'), name='Points_Gained_In_4th')
+    return rankings, slopes[0], intercepts[0], ns[0]
+
+@functools.lru_cache(maxsize=8)
+def _load(season_ids):
+    # One Parquet file per combination of seasons
+    return parquet_cache(f"closing_{season_ids}", DB_URL)(_fetch_closing_data)(season_ids)
+
+def load(season_ids=('22024',)):
+    """
+    Returns one row per team-game for the given season IDs:
+    Team, Q3_Lead (margin after Q3) and Final_Result (final margin).
+    Repeat calls in the same process are served from memory, and across
+    runs from the Parquet cache. Callers get their own copy, so adding
+    columns to it is safe.
+    """
+    return _load(tuple(season_ids)).copy()
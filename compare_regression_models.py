@@ -1,91 +1,39 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sqlalchemy import create_engine
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import r2_score
+from closing_data import load
 from scipy.optimize import curve_fit
+from scipy.special import expit
 
 # CONFIG
-DB_URL = 'sqlite:///nba_analysis.db'
 TARGET_SEASON_ID = '22024'
 
-def get_closing_data():
-    engine = create_engine(DB_URL)
-    print(f"   Fetching data for Season {TARGET_SEASON_ID}...")
-    
-    query = f"""
-    WITH q3_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 3 
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    ),
-    final_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 4
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    )
-    SELECT 
-        g.game_id,
-        t_home.abbreviation as home_team,
-        t_away.abbreviation as away_team,
-        q3.score_home as q3_h,
-        q3.score_away as q3_a,
-        final.score_home as f_h,
-        final.score_away as f_a
-    FROM games g
-    JOIN q3_scores q3 ON g.game_id = q3.game_id
-    JOIN final_scores final ON g.game_id = final.game_id
-    JOIN teams t_home ON g.home_team_id = t_home.team_id
-    JOIN teams t_away ON g.away_team_id = t_away.team_id
-    WHERE g.season_id = '{TARGET_SEASON_ID}'
-    """
-    
-    try:
-        raw_df = pd.read_sql(query, engine)
-        if raw_df.empty: return pd.DataFrame()
-
-        cols = ['q3_h', 'q3_a', 'f_h', 'f_a']
-        for c in cols: raw_df[c] = pd.to_numeric(raw_df[c], errors='coerce')
-        
-        # Fill Forward
-        raw_df[cols] = raw_df.groupby('game_id')[cols].ffill()
-        raw_df = raw_df.dropna()
+# --- MODELS ---
 
-        # Calculate Margins
-        raw_df['Q3_Margin'] = raw_df['q3_h'] - raw_df['q3_a']
-        raw_df['Final_Margin'] = raw_df['f_h'] - raw_df['f_a']
-        
-        # Stack
-        home_df = raw_df[['home_team', 'Q3_Margin', 'Final_Margin']].copy()
-        home_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
-        
-        away_df = raw_df[['away_team', 'Q3_Margin', 'Final_Margin']].copy()
-        away_df['Q3_Lead'] = away_df['Q3_Margin'] * -1
-        away_df['Final_Result'] = away_df['Final_Margin'] * -1
-        
-        # --- FIX: Select 'away_team' BEFORE renaming ---
-        away_df = away_df[['away_team', 'Q3_Lead', 'Final_Result']]
-        away_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
-        
-        return pd.concat([home_df, away_df], ignore_index=True)
-        
-    except Exception as e:
-        print(f"Error: {e}")
-        return pd.DataFrame()
+def linfit(x, y):
+    """Closed-form single-feature OLS. Returns (slope, intercept)."""
+    x_mean, y_mean = x.mean(), y.mean()
+    dx = x - x_mean
+    slope = (dx * (y - y_mean)).sum() / (dx * dx).sum()
+    return slope, y_mean - slope * x_mean
 
-# --- MODELS ---
+def r2_score(y, y_pred):
+    """Coefficient of determination (same as sklearn.metrics.r2_score for 1-D y)."""
+    return 1 - ((y - y_pred) ** 2).sum() / ((y - y.mean()) ** 2).sum()
 
 def sigmoid_func(x, L, x0, k, b):
-    # Generalized Logistic Function
-    return L / (1 + np.exp(-k*(x-x0))) + b
+    # Generalized Logistic Function (expit = 1 / (1 + exp(-t)) in one ufunc pass)
+    return L * expit(k*(x-x0)) + b
+
+def sigmoid_jac(x, L, x0, k, b):
+    """Analytic Jacobian of sigmoid_func, so curve_fit skips finite differences."""
+    s = expit(k*(x-x0))
+    ds = L * s * (1 - s)
+    return np.column_stack([s, -k * ds, (x - x0) * ds, np.ones_like(x)])
 
 def compare_models():
     print("--- 📊 REGRESSION MODEL SHOWDOWN ---")
-    df = get_closing_data()
+    df = load((TARGET_SEASON_ID,))
     if df.empty:
         print("No data found.")
         return
@@ -94,15 +42,13 @@ def compare_models():
     y = df['Final_Result'].values
     
     # 1. Linear Regression
-    lin_model = LinearRegression()
-    lin_model.fit(X.reshape(-1, 1), y)
-    y_pred_lin = lin_model.predict(X.reshape(-1, 1))
+    slope, intercept = linfit(X, y)
+    y_pred_lin = slope * X + intercept
     r2_lin = r2_score(y, y_pred_lin)
     
     # 2. Polynomial Regression (Degree 3 - S-shapedish)
     poly_coeffs = np.polyfit(X, y, 3)
-    poly_func = np.poly1d(poly_coeffs)
-    y_pred_poly = poly_func(X)
+    y_pred_poly = np.polyval(poly_coeffs, X)
     r2_poly = r2_score(y, y_pred_poly)
     
     # 3. Sigmoid Regression
@@ -111,7 +57,7 @@ def compare_models():
     
     sigmoid_success = False
     try:
-        popt, _ = curve_fit(sigmoid_func, X, y, p0=p0, maxfev=10000)
+        popt, _ = curve_fit(sigmoid_func, X, y, p0=p0, jac=sigmoid_jac, maxfev=10000)
         y_pred_sig = sigmoid_func(X, *popt)
         r2_sig = r2_score(y, y_pred_sig)
         sigmoid_success = True
@@ -141,11 +87,11 @@ def compare_models():
     x_range = np.linspace(min(X), max(X), 200)
     
     # Plot Linear
-    plt.plot(x_range, lin_model.predict(x_range.reshape(-1, 1)), 
+    plt.plot(x_range, slope * x_range + intercept, 
              color='blue', linestyle='--', label=f'Linear (R²={r2_lin:.2f})')
              
     # Plot Poly
-    plt.plot(x_range, poly_func(x_range), 
+    plt.plot(x_range, np.polyval(poly_coeffs, x_range), 
              color='orange', linewidth=2, label=f'Poly D3 (R²={r2_poly:.2f})')
              
     # Plot Sigmoid
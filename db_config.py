@@ -0,0 +1,35 @@
+import functools
+from sqlalchemy import create_engine, event
+
+DB_URL = 'sqlite:///nba_analysis.db'
+
+# SQLite tuning for our workload: big scans over play_by_play, bulk appends
+# during ingestion, and (almost) nothing running concurrently.
+SQLITE_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",       # Readers don't block the writer (persists in the file)
+    "PRAGMA synchronous=NORMAL",     # Safe with WAL; skips an fsync on every commit
+    "PRAGMA cache_size=-262144",     # 256 MB page cache (negative = KiB)
+    "PRAGMA mmap_size=268435456",    # Read pages via mmap instead of read() syscalls
+    "PRAGMA temp_store=MEMORY",      # Sorts / temp B-trees stay in RAM
+]
+
+@functools.lru_cache(maxsize=None)
+def open_engine(db_url=DB_URL):
+    """
+    Returns the SQLAlchemy engine for db_url. For SQLite, every new connection is
+    tuned with SQLITE_PRAGMAS (most PRAGMAs only last for the connection they ran on).
+    Other databases (e.g. Postgres via DATABASE_URL) are returned untouched.
+    The engine is created once per URL and shared, so every module in the
+    process draws from the same connection pool.
+    """
+    engine = create_engine(db_url)
+
+    if engine.dialect.name == 'sqlite':
+        @event.listens_for(engine, "connect")
+        def _apply_pragmas(dbapi_conn, connection_record):
+            cursor = dbapi_conn.cursor()
+            for pragma in SQLITE_PRAGMAS:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return engine
@@ -1,13 +1,30 @@
-import pandas as pd
-from sqlalchemy import create_engine
+from db_config import open_engine
 
-engine = create_engine('sqlite:///nba_analysis.db')
+engine = open_engine('sqlite:///nba_analysis.db')
+TABLES = ['games', 'teams', 'play_by_play']
 
 print("--- 📊 TABLE COUNTS ---")
-for table in ['games', 'teams', 'play_by_play']:
+with engine.connect() as conn:
+    existing = {r[0] for r in conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table'"
+    )}
     try:
-        count = pd.read_sql(f"SELECT COUNT(*) FROM {table}", engine).iloc[0,0]
+        # Row counts saved by the last ANALYZE (first number in 'stat')
+        stats = dict(conn.exec_driver_sql(
+            "SELECT tbl, MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 GROUP BY tbl"
+        ).fetchall())
+    except Exception:
+        stats = {}  # ANALYZE has never been run
+
+    for table in TABLES:
+        if table not in existing:
+            print(f"{table.ljust(15)}: (Table Not Found)")
+            continue
+
+        # COUNT(*) scans the whole table, so only fall back to it without stats
+        count = stats.get(table)
+        approx = "~" if count is not None else ""
+        if count is None:
+            count = conn.exec_driver_sql(f"SELECT COUNT(*) FROM {table}").scalar()
         status = "✅ OK" if count > 0 else "❌ EMPTY"
-        print(f"{table.ljust(15)}: {count} rows  {status}")
-    except Exception as e:
-        print(f"{table.ljust(15)}: (Table Not Found)")
\ No newline at end of file
+        print(f"{table.ljust(15)}: {approx}{count} rows  {status}")
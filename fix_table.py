@@ -1,6 +1,7 @@
 import sys
 import logging
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from db_config import open_engine
 from models import init_db, Base
 from logger_config import setup_logger
 
@@ -15,7 +16,7 @@ def reset_table(table_name_to_reset):
     Drops a specific table and then re-initializes the database schema,
     which recreates the table based on its definition in models.py.
     """
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     logging.info(f"Connecting to {DB_URL}...")
     
     # --- Safety Check ---
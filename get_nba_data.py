@@ -1,10 +1,59 @@
 import os
+import csv
+from io import StringIO
 import pandas as pd
 from nba_api.stats.endpoints import leaguegamefinder
-from sqlalchemy import create_engine
+from sqlalchemy import text
+from db_config import open_engine
+from parquet_cache import daily_api_cache
+from rate_limiter import nba_api_limiter, with_retries
 from dotenv import load_dotenv
 from urllib.parse import urlparse
 
+# CONFIG
+MAX_RETRIES = 3        # Try 3 times before giving up on the API
+RETRY_PAUSE = 10       # Seconds to wait after the first failure (doubles each time)
+SCHEDULE_MAX_AGE = 600 # Refetch season schedules after 10 minutes (games finish during the day)
+
+@daily_api_cache('leaguegamefinder')
+@with_retries(attempts=MAX_RETRIES, base=RETRY_PAUSE, retry_on=Exception)
+def fetch_league_games():
+    """
+    Downloads every NBA game from LeagueGameFinder, retrying with backoff.
+    The raw response is cached per UTC day in cache/, so re-running the
+    pipeline on the same day skips the (large, rate-limited) API call.
+    """
+    nba_api_limiter.acquire()
+    # '00' = NBA, '10' = WNBA, '20' = G-League
+    game_finder = leaguegamefinder.LeagueGameFinder(league_id_nullable='00', timeout=30)
+    return game_finder.league_game_finder_results.get_data_frame()
+
+@daily_api_cache('season_games', max_age=SCHEDULE_MAX_AGE)
+@with_retries(attempts=MAX_RETRIES, base=RETRY_PAUSE)
+def fetch_season_games(season, season_type):
+    """One season's games of one type (e.g. '2024-25', 'Playoffs'), cached for SCHEDULE_MAX_AGE."""
+    nba_api_limiter.acquire()
+    finder = leaguegamefinder.LeagueGameFinder(
+        league_id_nullable='00',
+        season_nullable=season,
+        season_type_nullable=season_type
+    )
+    return finder.league_game_finder_results.get_data_frame()
+
+def psql_insert_copy(table, conn, keys, data_iter):
+    """
+    pandas to_sql method for Postgres: streams the rows through COPY FROM STDIN
+    (one bulk load) instead of issuing INSERT statements.
+    """
+    dbapi_conn = conn.connection
+    with dbapi_conn.cursor() as cur:
+        buf = StringIO()
+        csv.writer(buf).writerows(data_iter)
+        buf.seek(0)
+
+        columns = ', '.join(f'"{k}"' for k in keys)
+        table_name = f'{table.schema}.{table.name}' if table.schema else table.name
+        cur.copy_expert(f'COPY {table_name} ({columns}) FROM STDIN WITH CSV', buf)
 
 def fetch_and_store_nba_data():
     """
@@ -32,10 +81,7 @@ def fetch_and_store_nba_data():
 
     print("1. Requesting data from NBA API (NBA League Only)...")
     
-    # '00' = NBA, '10' = WNBA, '20' = G-League
-    game_finder = leaguegamefinder.LeagueGameFinder(league_id_nullable='00')
-    
-    games_df = game_finder.get_data_frames()[0]
+    games_df = fetch_league_games()
     
     print(f"   Success! Downloaded {len(games_df)} NBA games.")
     
@@ -44,10 +90,21 @@ def fetch_and_store_nba_data():
     # For now, we will keep everything to be safe.
 
     print("2. Saving to Database...")
-    engine = create_engine(db_connection_str)
+    engine = open_engine(db_connection_str)
     
+    # Postgres bulk-loads via COPY. SQLite keeps pandas' default executemany,
+    # which reuses one prepared INSERT and beats multi-row VALUES there.
+    method = psql_insert_copy if engine.dialect.name == 'postgresql' else None
+
+    # Load into a staging table first, then swap it in, so 'games' is never
+    # missing or half-written if the load fails part way through.
+    games_df.to_sql('games_staging', engine, if_exists='replace', index=False,
+                    chunksize=10000, method=method)
+
     # This will OVERWRITE the previous 'dirty' table with this new clean one
-    games_df.to_sql('games', engine, if_exists='replace', index=False, chunksize=500)
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS games"))
+        conn.execute(text("ALTER TABLE games_staging RENAME TO games"))
     
     print("3. Pipeline Complete.")
     
@@ -1,14 +1,27 @@
 import pandas as pd
-import time
 import os
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from db_config import open_engine
 from nba_api.stats.endpoints import boxscoresummaryv3
 from dotenv import load_dotenv
+from rate_limiter import nba_api_limiter, with_retries
+
+# --- CONFIGURATION ---
+MAX_WORKERS = 4        # Concurrent API requests (kept low to respect the rate limit)
+MAX_RETRIES = 3        # Try 3 times before giving up on a game
+PROGRESS_EVERY = 100   # Print progress every N games instead of on every game
+
+@with_retries(attempts=MAX_RETRIES, retry_on=Exception)
+def fetch_line_score(game_id):
+    """Fetches one game's line score, backing off exponentially on errors (e.g. timeouts, 429s)."""
+    nba_api_limiter.acquire()
+    box_summary = boxscoresummaryv3.BoxScoreSummaryV3(game_id=game_id)
+    return box_summary.line_score.get_data_frame()
 
 def get_quarter_data():
     load_dotenv()
     db_str = os.getenv("DATABASE_URL", "sqlite:///nba_analysis.db")
-    engine = create_engine(db_str)
+    engine = open_engine(db_str)
     
     print(f"Connecting to: {db_str}")
 
@@ -18,22 +31,23 @@ def get_quarter_data():
     
     print(f"Found {len(game_ids)} games. Processing...")
 
-    all_line_scores = []
+    # 2. Fetch line scores. The time is all spent waiting on HTTP, so a few
+    # threads overlap the round-trips instead of paying for them one by one.
+    results = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(fetch_line_score, game_id): game_id for game_id in game_ids}
+        for i, future in enumerate(as_completed(futures)):
+            game_id = futures[future]
+            try:
+                results[game_id] = future.result()
+            except Exception as e:
+                print(f"Error fetching game {game_id}: {e}")
 
-    for i, game_id in enumerate(game_ids):
-        try:
-            print(f"[{i+1}/{len(game_ids)}] Game {game_id}...", end="\r")
-            
-            box_summary = boxscoresummaryv3.BoxScoreSummaryV3(game_id=game_id)
-            line_score_df = box_summary.line_score.get_data_frame()
-            
-            if not line_score_df.empty:
-                all_line_scores.append(line_score_df)
-            
-            time.sleep(0.6)
-            
-        except Exception as e:
-            print(f"Error fetching game {game_id}: {e}")
+            if (i + 1) % PROGRESS_EVERY == 0 or i + 1 == len(game_ids):
+                print(f"[{i+1}/{len(game_ids)}] games fetched...")
+
+    # Keep the original game order regardless of which request finished first
+    all_line_scores = [results[g] for g in game_ids if g in results and not results[g].empty]
 
     # 3. Process Data
     if all_line_scores:
@@ -60,11 +74,11 @@ def get_quarter_data():
         # so our database table structure doesn't break.
         potential_ot_cols = ['period5Score', 'period6Score', 'period7Score']
         
-        for col in potential_ot_cols:
-            if col not in final_df.columns:
-                final_df[col] = 0 # Create column filled with 0
-            else:
-                final_df[col] = final_df[col].fillna(0) # Fill NaNs with 0
+        # One reindex adds every missing OT column (filled with 0), then one
+        # fillna covers the NaNs in the ones that were already there
+        missing = [c for c in potential_ot_cols if c not in final_df.columns]
+        final_df = final_df.reindex(columns=[*final_df.columns, *missing], fill_value=0)
+        final_df[potential_ot_cols] = final_df[potential_ot_cols].fillna(0)
 
         final_df.rename(columns=rename_map, inplace=True)
         
@@ -78,7 +92,7 @@ def get_quarter_data():
         # Save to database
         final_df[cols_to_keep].to_sql('line_scores', engine, if_exists='replace', index=False)
         
-        print(f"\nSUCCESS! Processed {len(final_df)} team entries.")
+        print(f"SUCCESS! Processed {len(final_df)} team entries.")
         print(final_df[cols_to_keep].head())
             
     else:
@@ -1,89 +1,94 @@
 import pandas as pd
-import time
 import os
-import random
-from sqlalchemy import create_engine
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import text
+from db_config import open_engine
 from nba_api.stats.endpoints import scoreboardv2
 from requests.exceptions import ReadTimeout, ConnectionError, RequestException
 from dotenv import load_dotenv
+from rate_limiter import nba_api_limiter, with_retries
 
 # --- CONFIGURATION ---
 BATCH_SIZE = 10        # Save to DB every 10 dates
 MAX_RETRIES = 3        # Try 3 times before giving up on a specific date
-BASE_SLEEP = 1.0       # Seconds to sleep between successful requests
-ERROR_SLEEP = 15       # Seconds to sleep after a timeout
+ERROR_SLEEP = 15       # Seconds to sleep after a timeout (doubles on each further failure)
+MAX_WORKERS = 4        # Dates downloaded concurrently (the shared rate limiter caps the total)
+
+# Game days with no line scores yet. The API returns dates like
+# '2023-10-25T00:00:00', so only the first 10 characters are compared.
+MISSING_DATES_QUERY = """
+SELECT GAME_DATE FROM games
+EXCEPT
+SELECT substr(GAME_DATE_EST, 1, 10) FROM line_scores
+ORDER BY GAME_DATE
+"""
+
+@with_retries(attempts=MAX_RETRIES, base=ERROR_SLEEP, retry_on=(ReadTimeout, ConnectionError))
+def download_line_scores(date_str):
+    nba_api_limiter.acquire()
+    # We set a distinct timeout so it doesn't hang forever
+    board = scoreboardv2.ScoreboardV2(game_date=date_str, timeout=30)
+    return board.line_score.get_data_frame()
+
+def fetch_date(date_str):
+    """Worker: downloads one date's line scores, retrying on timeouts. Returns None if it gives up."""
+    try:
+        return download_line_scores(date_str)
+    except (ReadTimeout, ConnectionError):
+        print(f"\n   ⚠️  Timeout/Connection Error on {date_str} after {MAX_RETRIES} attempts. Skipping.")
+    except Exception as e:
+        print(f"\n   ❌ Unexpected Error on {date_str}: {e}")
+    return None # Move to next date
 
 def get_quarters_robust():
     load_dotenv()
     db_str = os.getenv("DATABASE_URL", "sqlite:///nba_analysis.db")
-    engine = create_engine(db_str)
+    engine = open_engine(db_str)
     
     print(f"--- NBA DATA PIPELINE: ROBUST MODE ---")
     print(f"Database: {db_str}")
 
-    # 1. Get ALL target dates from the Games table
+    # 1. Count ALL target dates in the Games table
     print("1. analyzing missing data...")
-    all_dates_df = pd.read_sql("SELECT DISTINCT GAME_DATE FROM games", engine)
-    all_dates = set(all_dates_df['GAME_DATE'].tolist())
+    with engine.connect() as conn:
+        total_dates = conn.execute(text("SELECT COUNT(DISTINCT GAME_DATE) FROM games")).scalar()
 
-    # 2. Get dates we ALREADY have in the line_scores table
+    # 2. Let the database work out which dates are missing from line_scores
     # We wrap this in a try/except because the table might not exist yet
     try:
-        existing_dates_df = pd.read_sql("SELECT DISTINCT GAME_DATE_EST FROM line_scores", engine)
-        # The API returns dates like '2023-10-25T00:00:00', so we chop off the time part
-        existing_dates = set([d.split('T')[0] for d in existing_dates_df['GAME_DATE_EST'].tolist()])
+        missing_dates = pd.read_sql(MISSING_DATES_QUERY, engine)['GAME_DATE'].tolist()
     except Exception:
-        existing_dates = set()
+        missing_dates = pd.read_sql("SELECT DISTINCT GAME_DATE FROM games ORDER BY GAME_DATE", engine)['GAME_DATE'].tolist()
         print("   (No existing line_scores table found. Starting from scratch.)")
 
     # 3. Calculate what is missing
-    missing_dates = sorted(list(all_dates - existing_dates))
     total_missing = len(missing_dates)
     
     if total_missing == 0:
         print("🎉 Great news! Your database is already up to date. No downloads needed.")
         return
 
-    print(f"   Found {len(all_dates)} game days total.")
-    print(f"   Found {len(existing_dates)} days already downloaded.")
+    print(f"   Found {total_dates} game days total.")
+    print(f"   Found {total_dates - total_missing} days already downloaded.")
     print(f"   Downloading remaining {total_missing} days...")
     print("------------------------------------------------")
 
-    # 4. The Loop
+    # 4. The Loop: workers download, this thread does every DB write
     batch_data = []
     
-    for i, date_str in enumerate(missing_dates):
-        success = False
-        attempts = 0
-        
-        while not success and attempts < MAX_RETRIES:
-            try:
-                print(f"[{i+1}/{total_missing}] Fetching {date_str} (Attempt {attempts+1})...", end="\r")
-                
-                # We set a distinct timeout so it doesn't hang forever
-                board = scoreboardv2.ScoreboardV2(game_date=date_str, timeout=30)
-                daily_stats = board.line_score.get_data_frame()
-                
-                if not daily_stats.empty:
-                    batch_data.append(daily_stats)
-                
-                success = True
-                # Sleep a variable amount to look more human
-                time.sleep(BASE_SLEEP + random.random()) 
-
-            except (ReadTimeout, ConnectionError) as e:
-                attempts += 1
-                print(f"\n   ⚠️  Timeout/Connection Error on {date_str}. Sleeping {ERROR_SLEEP}s...")
-                time.sleep(ERROR_SLEEP)
-            except Exception as e:
-                print(f"\n   ❌ Unexpected Error on {date_str}: {e}")
-                break # Move to next date on unknown error
-
-        # 5. Checkpoint: Save every BATCH_SIZE or at the very end
-        if len(batch_data) >= BATCH_SIZE or (i + 1 == total_missing):
-            save_batch(batch_data, engine)
-            batch_data = [] # Clear memory
-            print(f"\n   ✅ Saved batch to database. Progress saved.")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(fetch_date, date_str) for date_str in missing_dates]
+        for i, future in enumerate(as_completed(futures)):
+            print(f"[{i+1}/{total_missing}] dates fetched...", end="\r")
+            daily_stats = future.result()
+            if daily_stats is not None and not daily_stats.empty:
+                batch_data.append(daily_stats)
+
+            # 5. Checkpoint: Save every BATCH_SIZE or at the very end
+            if len(batch_data) >= BATCH_SIZE or (i + 1 == total_missing):
+                save_batch(batch_data, engine)
+                batch_data = [] # Clear memory
+                print(f"\n   ✅ Saved batch to database. Progress saved.")
 
 def save_batch(data_list, engine):
     """Helper function to process and save a list of dataframes"""
@@ -92,13 +97,11 @@ def save_batch(data_list, engine):
 
     final_df = pd.concat(data_list, ignore_index=True)
     
-    # Ensure OT columns exist
+    # Ensure OT columns exist, as whole numbers (a NaN from a game without
+    # overtime would otherwise make the whole column float / REAL)
     ot_cols = ['PTS_OT1', 'PTS_OT2', 'PTS_OT3', 'PTS_OT4']
-    for col in ot_cols:
-        if col not in final_df.columns:
-            final_df[col] = 0
-        else:
-            final_df[col] = final_df[col].fillna(0)
+    final_df = final_df.reindex(columns=final_df.columns.union(ot_cols, sort=False), fill_value=0)
+    final_df[ot_cols] = final_df[ot_cols].fillna(0).astype('int16')
 
     # Select Columns
     cols_to_keep = [
@@ -1,92 +1,63 @@
 import pandas as pd
-import time
+import sys
 import logging
-from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlalchemy import text
+from db_config import open_engine
 from requests.exceptions import ReadTimeout, ConnectionError, JSONDecodeError
-from nba_api.stats.endpoints import leaguegamefinder, playbyplayv3
+from nba_api.stats.endpoints import playbyplayv3
 from models import PlayByPlay
+from ingest_game import prepare_df, get_missing_games
+from build_score_cache import build_score_cache, refresh_stats, PBP_SCORE_INDEX, PBP_SCORE_INDEX_NAME
+from get_nba_data import fetch_season_games
 from logger_config import setup_logger
+from rate_limiter import nba_api_limiter, with_retries
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 TARGET_SEASON = '2024-25'
-RETRY_PAUSE = 300  # 5 minutes pause if banned
-
-# --- MINIMAL COLUMN MAP (Just for PBP) ---
-COLUMN_MAP = {
-    'game_id': ['gameId', 'GAME_ID'],
-    'team_id': ['teamId', 'TEAM_ID'],
-    'player_id': ['personId', 'PLAYER_ID', 'person_id'],
-    'event_num': ['actionNumber', 'EVENTNUM'],
-    'period': ['period', 'PERIOD'],
-    'clock': ['clock', 'PCTIMESTRING'],
-    'action_type': ['actionType', 'EVENTMSGTYPE'],
-    'sub_type': ['subType', 'EVENTMSGACTIONTYPE'],
-    'description': ['description', 'HOMEDESCRIPTION', 'VISITORDESCRIPTION'],
-    'shot_result': ['shotResult'],
-    'loc_x': ['xLegacy', 'LOC_X'],
-    'loc_y': ['yLegacy', 'LOC_Y'],
-    'margin': ['pointsTotal', 'SCOREMARGIN'],
-    'score_home': ['scoreHome'],
-    'score_away': ['scoreAway']
-}
+RETRY_PAUSE = 300  # 5 minutes pause if banned (doubles on each further failure)
+MAX_ATTEMPTS = 3
+MAX_WORKERS = 4    # Concurrent API requests (the shared rate limiter caps the total)
 
 def get_db_engine():
-    return create_engine(DB_URL)
+    return open_engine(DB_URL)
 
-def prepare_df(df, table_model):
-    """Renames columns and keeps only what fits in the DB."""
-    final_cols = {}
-    for db_col, api_options in COLUMN_MAP.items():
-        for api_col in api_options:
-            if api_col in df.columns:
-                final_cols[api_col] = db_col
-                break
-    
-    df_renamed = df.rename(columns=final_cols)
-    valid_db_cols = [c.name for c in table_model.__table__.columns]
-    
-    # Return only valid columns that exist in the dataframe
-    return df_renamed[[c for c in df_renamed.columns if c in valid_db_cols]].copy()
-
-def clean_pbp(game_id, engine):
+def clean_pbp(game_id, conn):
     """Deletes any existing events for this game to prevent duplicates."""
-    with engine.connect() as conn:
-        try:
-            conn.execute(text("DELETE FROM play_by_play WHERE game_id = :gid"), {'gid': game_id})
-            conn.commit()
-        except Exception:
-            pass
+    try:
+        conn.execute(text("DELETE FROM play_by_play WHERE game_id = :gid"), {'gid': game_id})
+    except Exception:
+        pass
 
-def ingest_pbp_single(game_id, engine):
-    logging.info(f"⚡ Ingesting PBP for {game_id}...")
-    
-    clean_pbp(game_id, engine)
+@with_retries(attempts=MAX_ATTEMPTS, base=RETRY_PAUSE)
+def download_pbp(game_id):
+    nba_api_limiter.acquire()
+    return playbyplayv3.PlayByPlayV3(game_id=game_id, timeout=45).play_by_play.get_data_frame()
+
+def fetch_pbp(game_id):
+    """
+    Downloads and prepares one game's PBP (runs in a worker thread).
+    If the API blocks us, every worker backs off (see with_retries).
+    Returns None when the API has no events for the game.
+    """
+    pbp = download_pbp(game_id)
+    if pbp.empty:
+        return None
+
+    # Prepare Data
+    df_pbp = prepare_df(pbp, PlayByPlay)
+    df_pbp['game_id'] = game_id
     
-    try:
-        # Fetch Data
-        pbp = playbyplayv3.PlayByPlayV3(game_id=game_id, timeout=45).get_data_frames()[0]
-        
-        if pbp.empty:
-            logging.warning(f"No PBP data returned for {game_id}.")
-            return
+    # Deduplicate
+    return df_pbp.drop_duplicates(subset=['event_num'])
 
-        # Prepare Data
-        df_pbp = prepare_df(pbp, PlayByPlay)
-        df_pbp['game_id'] = game_id
-        
-        # Deduplicate
-        df_pbp = df_pbp.drop_duplicates(subset=['event_num'])
-        
-        # Save
-        df_pbp.to_sql('play_by_play', engine, if_exists='append', index=False)
-        logging.info(f"   ✅ Saved {len(df_pbp)} rows for {game_id}.")
-        
-    except (ReadTimeout, ConnectionError, JSONDecodeError) as e:
-        logging.warning(f"Timeout/Connection Error on {game_id}.")
-        raise e # Re-raise to trigger the pause in the main loop
-    except Exception as e:
-        logging.error(f"Unexpected error on {game_id}: {e}", exc_info=True)
+def save_pbp(game_id, df_pbp, engine):
+    """Replaces the game's events: delete + insert in one transaction (one commit per game, never half-written)."""
+    with engine.begin() as conn:
+        clean_pbp(game_id, conn)
+        df_pbp.to_sql('play_by_play', conn, if_exists='append', index=False, chunksize=5000)
+    logging.info(f"   ✅ Saved {len(df_pbp)} rows for {game_id}.")
 
 def get_todo_list(engine):
     print(f"📅 Fetching {TARGET_SEASON} complete schedule (Reg + Playoffs)...")
@@ -95,20 +66,19 @@ def get_todo_list(engine):
     season_types = ['Regular Season', 'Playoffs', 'PlayIn']
     all_dfs = []
     
-    for s_type in season_types:
-        try:
-            finder = leaguegamefinder.LeagueGameFinder(
-                league_id_nullable='00',
-                season_nullable=TARGET_SEASON,
-                season_type_nullable=s_type
-            )
-            df = finder.get_data_frames()[0]
-            if not df.empty:
-                print(f"   Found {len(df)} games for {s_type}.")
-                all_dfs.append(df)
-        except Exception:
-            # It's normal for Playoffs to be empty early in the season
-            pass
+    # The three schedules are independent, so request them all at once
+    with ThreadPoolExecutor(max_workers=len(season_types)) as executor:
+        futures = {executor.submit(fetch_season_games, TARGET_SEASON, s_type): s_type for s_type in season_types}
+        for future in futures:
+            s_type = futures[future]
+            try:
+                df = future.result()
+                if not df.empty:
+                    print(f"   Found {len(df)} games for {s_type}.")
+                    all_dfs.append(df)
+            except Exception:
+                # It's normal for Playoffs to be empty early in the season
+                pass
 
     if not all_dfs:
         print("❌ Critical Error: Could not find any games via API.")
@@ -119,19 +89,33 @@ def get_todo_list(engine):
     
     # Filter for completed games (Games with a W/L result)
     completed = all_games[all_games['WL'].notna()].copy()
-    target_ids = set(completed['GAME_ID'].unique())
+    target_ids = sorted(completed['GAME_ID'].unique())
     
-    # Check what we already have in PBP table
-    try:
-        existing = pd.read_sql("SELECT DISTINCT game_id FROM play_by_play", engine)
-        done_ids = set(existing['game_id'].tolist())
-    except:
-        done_ids = set()
-        
-    missing = sorted(list(target_ids - done_ids))
-    print(f"   Total Games: {len(target_ids)} | Already Done: {len(done_ids)} | To Do: {len(missing)}")
+    # Check which of them we already have in PBP table
+    missing = get_missing_games(engine, target_ids, 'play_by_play')
+    print(f"   Total Games: {len(target_ids)} | Already Done: {len(target_ids) - len(missing)} | To Do: {len(missing)}")
     return missing
     
+def download_and_save(missing_ids, engine):
+    """
+    Workers only download; every write happens here, on the main thread,
+    so SQLite only ever sees one writer.
+    """
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(fetch_pbp, game_id): game_id for game_id in missing_ids}
+        for future in as_completed(futures):
+            game_id = futures[future]
+            try:
+                df_pbp = future.result()
+                if df_pbp is None:
+                    logging.warning(f"No PBP data returned for {game_id}.")
+                    continue
+                save_pbp(game_id, df_pbp, engine)
+            except (ReadTimeout, ConnectionError, JSONDecodeError):
+                logging.error(f"Failed to ingest {game_id} after {MAX_ATTEMPTS} attempts. Skipping.")
+            except Exception as e:
+                logging.error(f"Unexpected error on {game_id}: {e}", exc_info=True)
+
 def run_fast_ingest():
     engine = get_db_engine()
     missing_ids = get_todo_list(engine)
@@ -142,26 +126,25 @@ def run_fast_ingest():
 
     logging.info(f"--- Starting FAST PBP Ingest for {len(missing_ids)} games ---")
     
-    for i, game_id in enumerate(missing_ids, 1):
-        success = False
-        attempts = 0
-        
-        while not success and attempts < 3:
-            try:
-                ingest_pbp_single(game_id, engine)
-                success = True
-                time.sleep(0.6) # Short pause for speed
-                
-            except (ReadTimeout, ConnectionError, JSONDecodeError):
-                attempts += 1
-                # Incremental backoff: wait longer after each failure
-                if attempts < 3:
-                    current_pause = RETRY_PAUSE * attempts
-                    logging.warning(f"API Limit hit on attempt {attempts}! Pausing for {current_pause}s...")
-                    time.sleep(current_pause)
-                    logging.info("Resuming...")
-                else:
-                    logging.error(f"Failed to ingest {game_id} after 3 attempts. Skipping.")
+    # Bulk load mode (e.g. a whole season from scratch): maintaining the wide
+    # covering index on every insert costs more than rebuilding it once at the end
+    bulk = '--bulk' in sys.argv
+    if bulk:
+        logging.info("Bulk mode: dropping the play_by_play score index until the load finishes...")
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {PBP_SCORE_INDEX_NAME}"))
+
+    try:
+        download_and_save(missing_ids, engine)
+    finally:
+        if bulk:
+            logging.info("Bulk mode: rebuilding the play_by_play score index...")
+            with engine.begin() as conn:
+                conn.execute(text(PBP_SCORE_INDEX))
+
+    # Refresh the Q3/Final score cache used by the analysis scripts
+    build_score_cache(engine)
+    refresh_stats(engine)
 
 if __name__ == "__main__":
     setup_logger()
@@ -1,7 +1,8 @@
 import pandas as pd
-import time
 import logging
-from sqlalchemy import create_engine, text
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import inspect, text
+from db_config import open_engine
 from requests.exceptions import ReadTimeout, ConnectionError, JSONDecodeError
 from nba_api.stats.endpoints import (
     boxscoretraditionalv3,
@@ -13,10 +14,11 @@ from nba_api.stats.endpoints import (
     gamerotation
 )
 from models import PlayerGameStats, PlayByPlay, PlayerMatchups, HustleStats, GameRotation
+from rate_limiter import nba_api_limiter
 
 # --- CONFIGURATION ---
 DB_URL = 'sqlite:///nba_analysis.db'
-engine = create_engine(DB_URL)
+engine = open_engine(DB_URL)
 
 # --- THE ROSETTA STONE ---
 COLUMN_MAP = {
@@ -85,114 +87,194 @@ COLUMN_MAP = {
     'score_away': ['scoreAway']
 }
 
-def clean_existing_game(game_id):
+def clean_existing_game(game_id, conn):
     """Deletes existing data for a game to prevent Unique Constraint errors."""
     tables = [
         'player_game_stats', 'play_by_play', 'hustle_stats', 
         'tracking_stats', 'game_rotations', 'player_matchups'
     ]
-    with engine.connect() as conn:
-        for table in tables:
-            try:
-                conn.execute(text(f"DELETE FROM {table} WHERE game_id = :gid"), {'gid': game_id})
-            except Exception:
-                pass
-        conn.commit()
+    # Skip tables that were never created: a failed DELETE would abort the
+    # surrounding transaction on Postgres.
+    existing = set(inspect(conn).get_table_names())
+    tables = [t for t in tables if t in existing]
+    if not tables:
+        return
+
+    # One statement finds which tables already hold rows for the game, so a
+    # brand-new game (the usual case) runs no DELETEs at all
+    probe = " UNION ALL ".join(
+        f"SELECT '{table}' WHERE EXISTS (SELECT 1 FROM {table} WHERE game_id = :gid)" for table in tables
+    )
+    for table in conn.execute(text(probe), {'gid': game_id}).scalars().all():
+        conn.execute(text(f"DELETE FROM {table} WHERE game_id = :gid"), {'gid': game_id})
+
+def get_missing_games(engine, game_ids, table):
+    """
+    Returns the game_ids (in the order given) that have no rows in table yet.
+    The ids go into a temp table and the database does the anti-join, so only
+    the missing ids come back, and a long schedule never runs into the
+    bound-parameter limit an IN (...) list would (999 on older SQLite builds).
+    """
+    game_ids = list(dict.fromkeys(game_ids))
+    with engine.begin() as conn:
+        # A fresh database has no table yet: every game is missing
+        if not inspect(conn).has_table(table):
+            return game_ids
+
+        conn.execute(text("CREATE TEMP TABLE IF NOT EXISTS schedule (game_id TEXT PRIMARY KEY, pos INTEGER)"))
+        conn.execute(text("DELETE FROM schedule"))
+        conn.execute(text("INSERT INTO schedule VALUES (:game_id, :pos)"),
+                     [{'game_id': g, 'pos': i} for i, g in enumerate(game_ids)])
+        return conn.execute(text(
+            f"SELECT s.game_id FROM schedule s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.game_id = s.game_id) "
+            f"ORDER BY s.pos"
+        )).scalars().all()
+
+# Compact dtypes for the wide PBP frames. Nullable ints keep missing values
+# (e.g. no shot location) as NULL instead of turning the column into REAL.
+COLUMN_DTYPES = {
+    'event_num': 'Int32', 'period': 'Int8', 'loc_x': 'Int16', 'loc_y': 'Int16',
+    'team_id': 'Int32', 'player_id': 'Int32',
+    'action_type': 'category', 'sub_type': 'category', 'shot_result': 'category',
+    'score_home': 'Int16', 'score_away': 'Int16',
+}
+
+# Columns the API sends as numeric strings ('' when there is no value); they're
+# parsed to numbers (blanks -> NULL) before the COLUMN_DTYPES cast
+NUMERIC_TEXT_COLUMNS = ['score_home', 'score_away']
+
+# (API columns, table) -> (rename map, columns to keep); each endpoint returns
+# the same columns for every game, so this is worked out once per endpoint
+_PREPARE_PLANS = {}
 
 def prepare_df(df, table_model):
     """Renames columns and drops any that don't match the database schema."""
-    final_cols = {}
-    for db_col, api_options in COLUMN_MAP.items():
-        for api_col in api_options:
-            if api_col in df.columns:
-                final_cols[api_col] = db_col
-                break
-    
-    df_renamed = df.rename(columns=final_cols)
-    valid_db_cols = [c.name for c in table_model.__table__.columns]
-    
-    return df_renamed[[c for c in df_renamed.columns if c in valid_db_cols]].copy()
+    key = (frozenset(df.columns), table_model.__tablename__)
+    plan = _PREPARE_PLANS.get(key)
+    if plan is None:
+        final_cols = {}
+        for db_col, api_options in COLUMN_MAP.items():
+            for api_col in api_options:
+                if api_col in df.columns:
+                    final_cols[api_col] = db_col
+                    break
 
-def ingest_game(game_id, full_mode=True):
-    logging.info(f"Starting ingest for Game {game_id}...")
+        valid_db_cols = {c.name for c in table_model.__table__.columns}
+        renamed = [final_cols.get(c, c) for c in df.columns]
+        plan = _PREPARE_PLANS[key] = (final_cols, [c for c in renamed if c in valid_db_cols])
+
+    final_cols, keep_cols = plan
+    df = df.rename(columns=final_cols)[keep_cols]
+    for c in NUMERIC_TEXT_COLUMNS:
+        if c in df.columns:
+            df[c] = pd.to_numeric(df[c], errors='coerce')
+    return df.astype({c: t for c, t in COLUMN_DTYPES.items() if c in df.columns})
+
+# CRITICAL: We want to catch 'normal' errors (like missing data) but 
+# LET THROUGH 'critical' errors (like Timeouts) so the Manager script detects them.
+CRITICAL_ERRORS = (ReadTimeout, ConnectionError, JSONDecodeError)
+
+# --- 1. BOX SCORES ---
+def fetch_box_scores(game_id):
+    nba_api_limiter.acquire()
+    trad = boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=game_id).player_stats.get_data_frame()
+    nba_api_limiter.acquire()
+    adv = boxscoreadvancedv3.BoxScoreAdvancedV3(game_id=game_id).player_stats.get_data_frame()
+    nba_api_limiter.acquire()
+    misc = boxscoremiscv3.BoxScoreMiscV3(game_id=game_id).player_stats.get_data_frame()
     
-    # Checkpoint: Wipe old data first
-    clean_existing_game(game_id)
+    # Same players on every endpoint: align them on the index and only add
+    # the columns trad doesn't already have (a merge would suffix the shared
+    # ones, e.g. minutes -> minutes_x / minutes_y)
+    keys = ['personId', 'teamId']
+    trad, adv, misc = (d.set_index(keys) for d in (trad, adv, misc))
+    adv = adv[adv.columns.difference(trad.columns, sort=False)]
+    misc = misc[misc.columns.difference(trad.columns.union(adv.columns), sort=False)]
+    merged = trad.join([adv, misc], how='inner').reset_index()
     
-    # CRITICAL: We want to catch 'normal' errors (like missing data) but 
-    # LET THROUGH 'critical' errors (like Timeouts) so the Manager script detects them.
-    CRITICAL_ERRORS = (ReadTimeout, ConnectionError, JSONDecodeError)
-
-    # --- 1. BOX SCORES ---
-    try:
-        trad = boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=game_id).get_data_frames()[0]
-        adv = boxscoreadvancedv3.BoxScoreAdvancedV3(game_id=game_id).get_data_frames()[0]
-        misc = boxscoremiscv3.BoxScoreMiscV3(game_id=game_id).get_data_frames()[0]
-        
-        merged = pd.merge(trad, adv, on=['personId', 'teamId'])
-        merged = pd.merge(merged, misc, on=['personId', 'teamId'])
-        
-        df_clean = prepare_df(merged, PlayerGameStats)
-        df_clean['game_id'] = game_id 
-        
-        df_clean.to_sql('player_game_stats', engine, if_exists='append', index=False)
-        logging.info(f"Saved {len(df_clean)} player stats for game {game_id}.")
-        time.sleep(0.6) # <--- ADD THIS
-    except CRITICAL_ERRORS: raise 
-    except Exception as e: logging.error(f"Error fetching Box Scores for {game_id}: {e}")
-
-    # --- 2. PLAY BY PLAY ---
-    if full_mode:
-        try:
-            pbp = playbyplayv3.PlayByPlayV3(game_id=game_id).get_data_frames()[0]
-            df_pbp = prepare_df(pbp, PlayByPlay)
-            df_pbp['game_id'] = game_id
-            df_pbp = df_pbp.drop_duplicates(subset=['event_num'])
-            df_pbp.to_sql('play_by_play', engine, if_exists='append', index=False)
-            logging.info(f"Saved {len(df_pbp)} PBP events for game {game_id}.")
-            time.sleep(0.6) # <--- ADD THIS
-        except CRITICAL_ERRORS: raise
-        except Exception as e: logging.error(f"Error fetching PBP for {game_id}: {e}")
+    df_clean = prepare_df(merged, PlayerGameStats)
+    df_clean['game_id'] = game_id 
+    return df_clean
 
-    # --- 3. HUSTLE STATS ---
-    if full_mode:
-        try:
-            hustle = hustlestatsboxscore.HustleStatsBoxScore(game_id=game_id).get_data_frames()[1]
-            df_hustle = prepare_df(hustle, HustleStats)
-            df_hustle['game_id'] = game_id
-            df_hustle.to_sql('hustle_stats', engine, if_exists='append', index=False)
-            logging.info(f"Saved {len(df_hustle)} hustle records for game {game_id}.")
-            time.sleep(0.6) # <--- ADD THIS
-        except CRITICAL_ERRORS: raise
-        except Exception as e: logging.error(f"Error fetching Hustle stats for {game_id}: {e}")
+# --- 2. PLAY BY PLAY ---
+def fetch_pbp(game_id):
+    nba_api_limiter.acquire()
+    pbp = playbyplayv3.PlayByPlayV3(game_id=game_id).play_by_play.get_data_frame()
+    df_pbp = prepare_df(pbp, PlayByPlay)
+    df_pbp['game_id'] = game_id
+    return df_pbp.drop_duplicates(subset=['event_num'])
 
-    # --- 4. MATCHUPS ---
-    if full_mode:
-        try:
-            matchups = boxscorematchupsv3.BoxScoreMatchupsV3(game_id=game_id).get_data_frames()[0]
-            df_match = prepare_df(matchups, PlayerMatchups)
-            df_match['game_id'] = game_id
-            df_match = df_match.dropna(subset=['off_player_id', 'def_player_id'])
-            df_match['off_player_id'] = df_match['off_player_id'].astype(int)
-            df_match['def_player_id'] = df_match['def_player_id'].astype(int)
-            df_match = df_match.drop_duplicates(subset=['off_player_id', 'def_player_id'])
-            df_match.to_sql('player_matchups', engine, if_exists='append', index=False)
-            logging.info(f"Saved {len(df_match)} matchup records for game {game_id}.")
-            time.sleep(0.6) # <--- ADD THIS
-        except CRITICAL_ERRORS: raise
-        except Exception as e: logging.error(f"Error fetching Matchups for {game_id}: {e}")
+# --- 3. HUSTLE STATS ---
+def fetch_hustle(game_id):
+    nba_api_limiter.acquire()
+    hustle = hustlestatsboxscore.HustleStatsBoxScore(game_id=game_id).player_stats.get_data_frame()
+    df_hustle = prepare_df(hustle, HustleStats)
+    df_hustle['game_id'] = game_id
+    return df_hustle
+
+# --- 4. MATCHUPS ---
+def fetch_matchups(game_id):
+    nba_api_limiter.acquire()
+    matchups = boxscorematchupsv3.BoxScoreMatchupsV3(game_id=game_id).player_stats.get_data_frame()
+    df_match = prepare_df(matchups, PlayerMatchups)
+    df_match['game_id'] = game_id
+    df_match = df_match.dropna(subset=['off_player_id', 'def_player_id'])
+    df_match['off_player_id'] = df_match['off_player_id'].astype(int)
+    df_match['def_player_id'] = df_match['def_player_id'].astype(int)
+    return df_match.drop_duplicates(subset=['off_player_id', 'def_player_id'])
+
+# --- 5. ROTATIONS ---
+def fetch_rotations(game_id):
+    nba_api_limiter.acquire()
+    rotation = gamerotation.GameRotation(game_id=game_id)
+    # The API returns one result set per team
+    rot = pd.concat([rotation.away_team.get_data_frame(), rotation.home_team.get_data_frame()],
+                    ignore_index=True)
+    df_rot = prepare_df(rot, GameRotation)
+    df_rot['game_id'] = game_id
+    return df_rot
 
-    # --- 5. ROTATIONS ---
-    if full_mode:
+# table -> (name used in error messages, fetcher). Box scores are always
+# fetched; the rest only in full mode.
+ENDPOINTS = {
+    'player_game_stats': ('Box Scores', fetch_box_scores),
+    'play_by_play': ('PBP', fetch_pbp),
+    'hustle_stats': ('Hustle stats', fetch_hustle),
+    'player_matchups': ('Matchups', fetch_matchups),
+    'game_rotations': ('Rotations', fetch_rotations),
+}
+
+def fetch_game(game_id, full_mode=True):
+    """
+    Downloads every endpoint for a game and returns {table_name: DataFrame}.
+    The endpoints are independent, so they are requested concurrently;
+    nba_api_limiter spaces the requests out across all threads (including
+    other games being fetched at the same time). Never touches the DB.
+    """
+    logging.info(f"Fetching Game {game_id}...")
+    tables = list(ENDPOINTS) if full_mode else ['player_game_stats']
+
+    with ThreadPoolExecutor(max_workers=len(tables)) as executor:
+        futures = {table: executor.submit(ENDPOINTS[table][1], game_id) for table in tables}
+
+    frames = {}
+    for table, future in futures.items():
         try:
-            rot = gamerotation.GameRotation(game_id=game_id).get_data_frames()[0]
-            df_rot = prepare_df(rot, GameRotation)
-            df_rot['game_id'] = game_id
-            df_rot.to_sql('game_rotations', engine, if_exists='append', index=False)
-            logging.info(f"Saved {len(df_rot)} rotation shifts for game {game_id}.")
-            # No sleep needed here, we sleep at the end of the function
+            frames[table] = future.result()
         except CRITICAL_ERRORS: raise
-        except Exception as e: logging.error(f"Error fetching Rotations for {game_id}: {e}")
+        except Exception as e: logging.error(f"Error fetching {ENDPOINTS[table][0]} for {game_id}: {e}")
+    return frames
 
+def save_game(game_id, frames):
+    """Wipes the game's old data and inserts the new frames in one transaction (a single commit)."""
+    with engine.begin() as conn:
+        clean_existing_game(game_id, conn)
+        for table, df in frames.items():
+            df.to_sql(table, conn, if_exists='append', index=False)
+    logging.info(f"Saved {', '.join(f'{len(df)} {t}' for t, df in frames.items())} rows for game {game_id}.")
+
+def ingest_game(game_id, full_mode=True):
+    logging.info(f"Starting ingest for Game {game_id}...")
+    save_game(game_id, fetch_game(game_id, full_mode))
     logging.info(f"Finished ingest for Game {game_id}.")
-    time.sleep(1.0)
\ No newline at end of file
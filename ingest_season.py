@@ -1,43 +1,51 @@
-import pandas as pd
 import sys
-import time
 import logging
-from sqlalchemy import create_engine
-from nba_api.stats.endpoints import leaguegamefinder
-from ingest_game import ingest_game
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from db_config import open_engine
+from ingest_game import fetch_game, save_game, get_missing_games
+from models import ensure_indexes
+from build_score_cache import build_score_cache, build_matchup_cache, refresh_stats
+from get_nba_data import fetch_season_games
 from requests.exceptions import ReadTimeout, ConnectionError, JSONDecodeError
 from logger_config import setup_logger
+from rate_limiter import with_retries
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 TARGET_SEASON = '2024-25'
-RETRY_PAUSE = 300  # Seconds to wait if API blocks us (5 Minutes)
+RETRY_PAUSE = 300  # Seconds to wait if API blocks us (5 Minutes, doubling on each further failure)
+TIMEOUT_PAUSE = 15 # Seconds to wait after a plain timeout / dropped connection (also doubling)
+MAX_ATTEMPTS = 5
+MAX_WORKERS = 4    # Games downloaded concurrently (the shared rate limiter caps the total)
 
-def get_season_schedule():
+def get_season_schedule(refresh=False):
+    """Completed game ids for TARGET_SEASON; refresh=True bypasses the cached schedule."""
     logging.info(f"Fetching schedule for {TARGET_SEASON}...")
-    finder = leaguegamefinder.LeagueGameFinder(
-        league_id_nullable='00',
-        season_nullable=TARGET_SEASON,
-        season_type_nullable='Regular Season'
-    )
-    df = finder.get_data_frames()[0]
+    df = fetch_season_games(TARGET_SEASON, 'Regular Season', refresh=refresh)
     completed_games = df[df['WL'].notna()].copy()
     unique_game_ids = completed_games['GAME_ID'].unique().tolist()
     logging.info(f"Found {len(unique_game_ids)} completed games for season.")
     return unique_game_ids
 
-def get_existing_games():
-    engine = create_engine(DB_URL)
-    try:
-        existing = pd.read_sql("SELECT DISTINCT game_id FROM player_game_stats", engine)
-        return existing['game_id'].tolist()
-    except Exception:
-        return []
+# A JSONDecodeError is nba_api choking on the HTML page stats.nba.com serves
+# when it blocks us, which takes minutes to lift. Timeouts and dropped
+# connections are usually one-off blips, so they start with a short wait.
+@with_retries(attempts=MAX_ATTEMPTS, base=TIMEOUT_PAUSE, bases={JSONDecodeError: RETRY_PAUSE})
+def fetch_with_retries(game_id):
+    """Worker: downloads one game, retrying up to MAX_ATTEMPTS times on timeouts or blocks."""
+    logging.info(f"Processing Game {game_id}...")
+    return fetch_game(game_id, full_mode=True)
 
 def run_season_ingest():
-    schedule_ids = get_season_schedule()
-    done_ids = get_existing_games()
-    missing_ids = [g for g in schedule_ids if g not in done_ids]
+    engine = open_engine(DB_URL)
+
+    # Older databases may predate some of the indexes in models.py
+    ensure_indexes(engine)
+
+    # The schedule is cached on disk (see get_nba_data.fetch_season_games);
+    # --refresh forces a new request, e.g. right after a game has finished
+    schedule_ids = get_season_schedule(refresh='--refresh' in sys.argv)
+    missing_ids = get_missing_games(engine, schedule_ids, 'player_game_stats')
     
     if not missing_ids:
         logging.info("Database is fully up to date. No new games to ingest.")
@@ -45,38 +53,24 @@ def run_season_ingest():
 
     logging.info(f"Starting ingestion for {len(missing_ids)} new games...")
     
-    # 4. The Smart Loop
-    for i, game_id in enumerate(missing_ids):
-        success = False
-        attempts = 0
-        
-        # Retry up to 3 times for the same game
-        while not success and attempts < 3:
+    # 4. The Smart Loop: workers download, the main thread does every DB write
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {executor.submit(fetch_with_retries, game_id): game_id for game_id in missing_ids}
+        for i, future in enumerate(as_completed(futures)):
+            game_id = futures[future]
             try:
-                logging.info(f"[{i+1}/{len(missing_ids)}] Processing Game {game_id} (Attempt {attempts+1})...")
-                
-                # Run the Worker
-                ingest_game(game_id, full_mode=True)
-                success = True
-                
-                # Standard polite wait
-                time.sleep(1.5) 
-                
-            except (ReadTimeout, ConnectionError, JSONDecodeError) as e:
-                attempts += 1
-                
-                # Implement incremental backoff: wait longer on the second failure.
-                # 1st failure: waits RETRY_PAUSE seconds.
-                # 2nd failure: waits RETRY_PAUSE * 2 seconds.
-                current_pause = RETRY_PAUSE * attempts
-                
-                logging.warning(f"API LIMIT/TIMEOUT on Game {game_id} (Attempt {attempts}). Pausing for {current_pause / 60:.1f} minutes...")
-                logging.warning(f"Pausing due to error: {e}")
-                time.sleep(current_pause)
+                save_game(game_id, future.result())
+                logging.info(f"[{i+1}/{len(missing_ids)}] Finished Game {game_id}.")
+            except (ReadTimeout, ConnectionError, JSONDecodeError):
+                logging.error(f"Giving up on Game {game_id} after {MAX_ATTEMPTS} attempts.")
             except Exception as e:
+                # A weird code error, not a network error: log it and move to the next game
                 logging.error(f"Unexpected Critical Error on {game_id}: {e}", exc_info=True)
-                break # Move to next game if it's a weird code error, not a network error
 
+    # Refresh the cached tables used by the analysis scripts
+    build_score_cache(engine)
+    build_matchup_cache(engine)
+    refresh_stats(engine)
     logging.info("Season Ingestion Complete.")
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 import logging
 import sys
+from logging.handlers import MemoryHandler, RotatingFileHandler
 
 LOG_FILE = 'reports/nba_database_builder.log'
+LOG_MAX_BYTES = 5_000_000  # Start a new log file after ~5 MB...
+LOG_BACKUPS = 3            # ...keeping this many old ones (.log.1, .log.2, ...)
+LOG_BUFFER = 500           # Records held in memory before they're written out
 
 def setup_logger():
     """
@@ -14,7 +18,15 @@ def setup_logger():
     logger.setLevel(logging.INFO)
 
     # Prevent duplicate handlers if this function is called multiple times
+    # (closing them first, so anything still buffered reaches the file)
     if logger.hasHandlers():
+        for handler in logger.handlers:
+            # Closing a MemoryHandler only flushes it and forgets its target,
+            # so the log file it writes to is closed separately
+            target = handler.target if isinstance(handler, MemoryHandler) else None
+            handler.close()
+            if target is not None:
+                target.close()
         logger.handlers.clear()
 
     # --- Formatter ---
@@ -30,6 +42,13 @@ def setup_logger():
     logger.addHandler(console_handler)
 
     # --- File Handler ---
-    file_handler = logging.FileHandler(LOG_FILE, mode='a', encoding='utf-8')
+    # Rotated so a long-running pipeline can't grow the log without bound
+    file_handler = RotatingFileHandler(LOG_FILE, maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUPS, encoding='utf-8')
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
\ No newline at end of file
+
+    # Buffered: the ingest loops log on every game, so records are written to
+    # the file in batches instead of one write() each. Warnings and errors
+    # flush the buffer straight away, and logging flushes the rest at exit.
+    buffered_handler = MemoryHandler(LOG_BUFFER, flushLevel=logging.WARNING, target=file_handler)
+    logger.addHandler(buffered_handler)
\ No newline at end of file
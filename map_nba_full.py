@@ -1,5 +1,6 @@
 import pandas as pd
-import time
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import RateLimiter
 from nba_api.stats.endpoints import (
     # --- PROFILES ---
     commonplayerinfo, commonteamroster, teaminfocommon,
@@ -24,96 +25,114 @@ SAMPLE_GAME_ID = '0022300001'
 SAMPLE_TEAM_ID = '1610612738' 
 SAMPLE_PLAYER_ID = '2544'     
 
+MAX_WORKERS = 4  # Endpoints requested concurrently
+
+# At most one endpoint every 0.6s. Spacing is measured from the previous
+# call, so time already spent on a slow request counts towards it.
+audit_limiter = RateLimiter(max_calls=1, period=0.6)
+
+# (category, name, endpoint factory). nba_api sends the request as soon as an
+# endpoint object is created, so these are lambdas: each one is only built
+# inside the worker thread that audits it.
+ENDPOINTS = [
+    # 1. PROFILES
+    ("PROFILE", "Player Info",
+     lambda: commonplayerinfo.CommonPlayerInfo(player_id=SAMPLE_PLAYER_ID)),
+    ("PROFILE", "Team Roster",
+     lambda: commonteamroster.CommonTeamRoster(team_id=SAMPLE_TEAM_ID, season='2023-24')),
+
+    # 2. CAREER STATS
+    ("CAREER", "Player Career Stats",
+     lambda: playercareerstats.PlayerCareerStats(player_id=SAMPLE_PLAYER_ID)),
+    ("CAREER", "Team History",
+     lambda: teamyearbyyearstats.TeamYearByYearStats(team_id=SAMPLE_TEAM_ID)),
+
+    # 3. LEAGUE DASHBOARDS
+    ("LEAGUE", "Standings",
+     lambda: leaguestandings.LeagueStandings(season='2023-24')),
+    ("LEAGUE", "League Leaders",
+     lambda: leagueleaders.LeagueLeaders(season='2023-24')),
+
+    # 4. GAME & SHOT DATA
+    ("GAME", "Scoreboard (Daily)",
+     lambda: scoreboardv2.ScoreboardV2(game_date='2023-10-25')),
+    ("GAME", "Shot Chart",
+     lambda: shotchartdetail.ShotChartDetail(
+         team_id=SAMPLE_TEAM_ID,
+         player_id=0,
+         game_id_nullable=SAMPLE_GAME_ID,
+         context_measure_simple='FGA')),
+
+    # 5. DETAILED BOX SCORES (V3)
+    ("BOXSCORE", "Traditional V3",
+     lambda: boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=SAMPLE_GAME_ID)),
+    ("BOXSCORE", "Advanced V3",
+     lambda: boxscoreadvancedv3.BoxScoreAdvancedV3(game_id=SAMPLE_GAME_ID)),
+    ("BOXSCORE", "Misc V3",
+     lambda: boxscoremiscv3.BoxScoreMiscV3(game_id=SAMPLE_GAME_ID)),
+
+    # 6. EVENTS
+    ("EVENTS", "Play By Play V2",
+     lambda: playbyplayv2.PlayByPlayV2(game_id=SAMPLE_GAME_ID)),
+]
+
+# The audit file, kept open for the whole run (see run_comprehensive_audit)
+_log_file = None
+
 def log_to_file(msg):
     """Writes a line to the text file and prints to console"""
     print(msg)
-    with open(FILE_NAME, "a", encoding="utf-8") as f:
-        f.write(msg + "\n")
+    _log_file.write(msg + "\n")
 
-def audit_endpoint(category, name, endpoint_call):
+def audit_endpoint(category, name, make_endpoint):
+    """
+    Worker: requests one endpoint and returns its section of the report as a
+    string. Nothing is written here, so the threads can't interleave output.
+    """
+    lines = [f"   > Pinging {name}..."]
     try:
-        log_to_file(f"   > Pinging {name}...")
-        
-        # Pause to respect rate limits
-        time.sleep(0.6) 
+        # Respect rate limits: only waits for whatever is left of the 0.6s gap
+        # (a slow request has often used it up already)
+        audit_limiter.acquire()
         
         # Get ALL dataframes (some endpoints return 2 or 3 tables)
-        dfs = endpoint_call.get_data_frames()
+        dfs = make_endpoint().get_data_frames()
         
         if not dfs:
-            log_to_file(f"     [WARNING] {name} returned no data.")
-            return
+            lines.append(f"     [WARNING] {name} returned no data.")
+            return "\n".join(lines)
 
         for i, df in enumerate(dfs):
-            log_to_file(f"\n### [{category}] {name.upper()} - Table {i} ###")
-            log_to_file(f"Row Count: {len(df)}")
-            log_to_file("Columns & Data Types:")
+            lines += [f"\n### [{category}] {name.upper()} - Table {i} ###",
+                      f"Row Count: {len(df)}",
+                      "Columns & Data Types:"]
             
-            for col, dtype in df.dtypes.items():
-                # We format this to look like "  - COLUMN_NAME : int64"
-                log_to_file(f"  - {col}: {dtype}")
-            
-            log_to_file("-" * 40)
+            # We format this to look like "  - COLUMN_NAME : int64"
+            lines += [f"  - {col}: {dtype}" for col, dtype in df.dtypes.items()]
+            lines.append("-" * 40)
         
     except Exception as e:
-        log_to_file(f"\n### [{category}] {name.upper()} - FAILED ###")
-        log_to_file(f"  Error: {e}")
-        log_to_file("-" * 40)
+        lines += [f"\n### [{category}] {name.upper()} - FAILED ###",
+                  f"  Error: {e}",
+                  "-" * 40]
+    return "\n".join(lines)
 
 def run_comprehensive_audit():
-    # Initialize/Clear the file
-    with open(FILE_NAME, "w", encoding="utf-8") as f:
-        f.write("=== NBA API COMPREHENSIVE SCHEMA MAP ===\n")
-        f.write("Generated via automated audit script.\n")
-        f.write("========================================\n\n")
-
-    print(f"Starting Deep Scan... Output will be saved to: {FILE_NAME}\n")
-
-    # 1. PROFILES
-    audit_endpoint("PROFILE", "Player Info", 
-                   commonplayerinfo.CommonPlayerInfo(player_id=SAMPLE_PLAYER_ID))
-    
-    audit_endpoint("PROFILE", "Team Roster", 
-                   commonteamroster.CommonTeamRoster(team_id=SAMPLE_TEAM_ID, season='2023-24'))
-
-    # 2. CAREER STATS
-    audit_endpoint("CAREER", "Player Career Stats", 
-                   playercareerstats.PlayerCareerStats(player_id=SAMPLE_PLAYER_ID))
-    
-    audit_endpoint("CAREER", "Team History", 
-                   teamyearbyyearstats.TeamYearByYearStats(team_id=SAMPLE_TEAM_ID))
-
-    # 3. LEAGUE DASHBOARDS
-    audit_endpoint("LEAGUE", "Standings", 
-                   leaguestandings.LeagueStandings(season='2023-24'))
-    
-    audit_endpoint("LEAGUE", "League Leaders", 
-                   leagueleaders.LeagueLeaders(season='2023-24'))
+    global _log_file
+    # Initialize/Clear the file. It stays open until every endpoint is logged.
+    with open(FILE_NAME, "w", encoding="utf-8") as _log_file:
+        _log_file.write("=== NBA API COMPREHENSIVE SCHEMA MAP ===\n")
+        _log_file.write("Generated via automated audit script.\n")
+        _log_file.write("========================================\n\n")
 
-    # 4. GAME & SHOT DATA
-    audit_endpoint("GAME", "Scoreboard (Daily)", 
-                   scoreboardv2.ScoreboardV2(game_date='2023-10-25'))
-    
-    audit_endpoint("GAME", "Shot Chart", 
-                   shotchartdetail.ShotChartDetail(
-                       team_id=SAMPLE_TEAM_ID, 
-                       player_id=0, 
-                       game_id_nullable=SAMPLE_GAME_ID,
-                       context_measure_simple='FGA'))
+        print(f"Starting Deep Scan... Output will be saved to: {FILE_NAME}\n")
 
-    # 5. DETAILED BOX SCORES (V3)
-    audit_endpoint("BOXSCORE", "Traditional V3", 
-                   boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=SAMPLE_GAME_ID))
-    
-    audit_endpoint("BOXSCORE", "Advanced V3", 
-                   boxscoreadvancedv3.BoxScoreAdvancedV3(game_id=SAMPLE_GAME_ID))
-    
-    audit_endpoint("BOXSCORE", "Misc V3", 
-                   boxscoremiscv3.BoxScoreMiscV3(game_id=SAMPLE_GAME_ID))
-
-    # 6. EVENTS
-    audit_endpoint("EVENTS", "Play By Play V2", 
-                   playbyplayv2.PlayByPlayV2(game_id=SAMPLE_GAME_ID))
+        # The requests are independent, so a few run at once (still paced by
+        # audit_limiter). map() hands the sections back in ENDPOINTS order,
+        # so the report reads the same as a sequential run.
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for section in executor.map(lambda task: audit_endpoint(*task), ENDPOINTS):
+                log_to_file(section)
 
     print(f"\n✅ Audit Complete! Open '{FILE_NAME}' to see the results.")
 
@@ -1,5 +1,6 @@
 import pandas as pd
-import time
+from concurrent.futures import ThreadPoolExecutor
+from rate_limiter import RateLimiter
 from nba_api.stats.endpoints import (
     # --- CORE 1: PROFILES ---
     commonplayerinfo, commonteamroster,
@@ -40,78 +41,95 @@ SAMPLE_TEAM_ID = '1610612738'
 SAMPLE_PLAYER_ID = '2544'     
 CURRENT_SEASON = '2023-24'
 
+MAX_WORKERS = 4  # Endpoints requested concurrently
+
+# One endpoint every 0.6s, counted from the previous call
+audit_limiter = RateLimiter(max_calls=1, period=0.6)
+
+# (category, name, endpoint factory): lambdas, because nba_api fires the
+# request when the endpoint is created and that should happen in a worker
+ENDPOINTS = [
+    # --- THE BASICS ---
+    ("PROFILE", "Player Info",
+     lambda: commonplayerinfo.CommonPlayerInfo(player_id=SAMPLE_PLAYER_ID)),
+    ("GAME", "Scoreboard",
+     lambda: scoreboardv2.ScoreboardV2(game_date='2024-05-21')),
+    ("BOXSCORE", "Traditional V3",
+     lambda: boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=SAMPLE_GAME_ID)),
+    ("EVENTS", "Play By Play V3",
+     lambda: playbyplayv3.PlayByPlayV3(game_id=SAMPLE_GAME_ID)),
+
+    # --- THE ADVANCED SUITE ---
+    ("HUSTLE", "Player Hustle Stats",
+     lambda: leaguehustlestatsplayer.LeagueHustleStatsPlayer(season=CURRENT_SEASON)),
+    ("TRACKING", "Speed & Distance",
+     lambda: leaguedashptstats.LeagueDashPtStats(season=CURRENT_SEASON, player_or_team='Player', pt_measure_type='SpeedDistance')),
+    ("LINEUPS", "5-Man Lineups",
+     lambda: leaguedashlineups.LeagueDashLineups(season=CURRENT_SEASON, group_quantity=5)),
+    ("SYNERGY", "Play Type: Isolation",
+     lambda: synergyplaytypes.SynergyPlayTypes(season=CURRENT_SEASON, player_or_team_abbreviation='P', play_type_nullable='Isolation', type_grouping_nullable='offensive')),
+
+    # --- THE SPECIALIST SUITE ---
+    # FIXED: Using BoxScoreMatchupsV3
+    ("DEFENSE", "Player Matchups",
+     lambda: boxscorematchupsv3.BoxScoreMatchupsV3(game_id=SAMPLE_GAME_ID)),
+    ("CLUTCH", "Clutch Stats",
+     lambda: leaguedashplayerclutch.LeagueDashPlayerClutch(season=CURRENT_SEASON)),
+    ("SHOTS", "Contextual Shooting",
+     lambda: playerdashptshots.PlayerDashPtShots(team_id=SAMPLE_TEAM_ID, player_id=SAMPLE_PLAYER_ID, season=CURRENT_SEASON)),
+    ("ROTATION", "Game Rotation",
+     lambda: gamerotation.GameRotation(game_id=SAMPLE_GAME_ID)),
+
+    # --- NEW: OPPONENT DASHBOARD ---
+    ("OPPONENT", "League Opponent Shooting",
+     lambda: leaguedashoppptshot.LeagueDashOppPtShot(season=CURRENT_SEASON)),
+]
+
+# Kept open for the whole run (see run_platinum_audit)
+_log_file = None
+
 def log_to_file(msg):
     print(msg)
-    with open(FILE_NAME, "a", encoding="utf-8") as f:
-        f.write(msg + "\n")
+    _log_file.write(msg + "\n")
 
-def audit_endpoint(category, name, endpoint_call):
+def audit_endpoint(category, name, make_endpoint):
+    """Worker: requests one endpoint and returns its report section as a string."""
+    lines = [f"   > Pinging {name}..."]
     try:
-        log_to_file(f"   > Pinging {name}...")
-        time.sleep(0.6) 
+        audit_limiter.acquire()
         
-        dfs = endpoint_call.get_data_frames()
+        dfs = make_endpoint().get_data_frames()
         
         if not dfs:
-            log_to_file(f"     [WARNING] {name} returned no data.")
-            return
+            lines.append(f"     [WARNING] {name} returned no data.")
+            return "\n".join(lines)
 
         for i, df in enumerate(dfs):
-            log_to_file(f"\n### [{category}] {name.upper()} - Table {i} ###")
-            log_to_file(f"Row Count: {len(df)}")
-            log_to_file("Columns & Data Types:")
-            for col, dtype in df.dtypes.items():
-                log_to_file(f"  - {col}: {dtype}")
-            log_to_file("-" * 40)
+            lines += [f"\n### [{category}] {name.upper()} - Table {i} ###",
+                      f"Row Count: {len(df)}",
+                      "Columns & Data Types:"]
+            lines += [f"  - {col}: {dtype}" for col, dtype in df.dtypes.items()]
+            lines.append("-" * 40)
         
     except Exception as e:
-        log_to_file(f"\n### [{category}] {name.upper()} - FAILED ###")
-        log_to_file(f"  Error: {e}")
-        log_to_file("-" * 40)
+        lines += [f"\n### [{category}] {name.upper()} - FAILED ###",
+                  f"  Error: {e}",
+                  "-" * 40]
+    return "\n".join(lines)
 
 def run_platinum_audit():
-    with open(FILE_NAME, "w", encoding="utf-8") as f:
-        f.write("=== NBA API PLATINUM SCHEMA MAP ===\n")
-        f.write(f"Generated for Season: {CURRENT_SEASON}\n")
-        f.write("=======================================\n\n")
-
-    print(f"Starting Platinum Scan... Output: {FILE_NAME}\n")
+    global _log_file
+    with open(FILE_NAME, "w", encoding="utf-8") as _log_file:
+        _log_file.write("=== NBA API PLATINUM SCHEMA MAP ===\n")
+        _log_file.write(f"Generated for Season: {CURRENT_SEASON}\n")
+        _log_file.write("=======================================\n\n")
 
-    # --- THE BASICS ---
-    audit_endpoint("PROFILE", "Player Info", 
-                   commonplayerinfo.CommonPlayerInfo(player_id=SAMPLE_PLAYER_ID))
-    audit_endpoint("GAME", "Scoreboard", 
-                   scoreboardv2.ScoreboardV2(game_date='2024-05-21'))
-    audit_endpoint("BOXSCORE", "Traditional V3", 
-                   boxscoretraditionalv3.BoxScoreTraditionalV3(game_id=SAMPLE_GAME_ID))
-    audit_endpoint("EVENTS", "Play By Play V3", 
-                   playbyplayv3.PlayByPlayV3(game_id=SAMPLE_GAME_ID))
-    
-    # --- THE ADVANCED SUITE ---
-    audit_endpoint("HUSTLE", "Player Hustle Stats", 
-                   leaguehustlestatsplayer.LeagueHustleStatsPlayer(season=CURRENT_SEASON))
-    audit_endpoint("TRACKING", "Speed & Distance", 
-                   leaguedashptstats.LeagueDashPtStats(season=CURRENT_SEASON, player_or_team='Player', pt_measure_type='SpeedDistance'))
-    audit_endpoint("LINEUPS", "5-Man Lineups", 
-                   leaguedashlineups.LeagueDashLineups(season=CURRENT_SEASON, group_quantity=5))
-    audit_endpoint("SYNERGY", "Play Type: Isolation", 
-                   synergyplaytypes.SynergyPlayTypes(season=CURRENT_SEASON, player_or_team_abbreviation='P', play_type_nullable='Isolation', type_grouping_nullable='offensive'))
+        print(f"Starting Platinum Scan... Output: {FILE_NAME}\n")
 
-    # --- THE SPECIALIST SUITE ---
-    # FIXED: Using BoxScoreMatchupsV3
-    audit_endpoint("DEFENSE", "Player Matchups", 
-                   boxscorematchupsv3.BoxScoreMatchupsV3(game_id=SAMPLE_GAME_ID))
-                   
-    audit_endpoint("CLUTCH", "Clutch Stats", 
-                   leaguedashplayerclutch.LeagueDashPlayerClutch(season=CURRENT_SEASON))
-    audit_endpoint("SHOTS", "Contextual Shooting", 
-                   playerdashptshots.PlayerDashPtShots(team_id=SAMPLE_TEAM_ID, player_id=SAMPLE_PLAYER_ID, season=CURRENT_SEASON))
-    audit_endpoint("ROTATION", "Game Rotation", 
-                   gamerotation.GameRotation(game_id=SAMPLE_GAME_ID))
-
-    # --- NEW: OPPONENT DASHBOARD ---
-    audit_endpoint("OPPONENT", "League Opponent Shooting", 
-                   leaguedashoppptshot.LeagueDashOppPtShot(season=CURRENT_SEASON))
+        # Several requests in flight at once; map() keeps the report in ENDPOINTS order
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for section in executor.map(lambda task: audit_endpoint(*task), ENDPOINTS):
+                log_to_file(section)
 
     print(f"\n✅ Platinum Audit Complete! Open '{FILE_NAME}' to view the full schema.")
 
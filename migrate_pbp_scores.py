@@ -0,0 +1,66 @@
+import logging
+from sqlalchemy import Integer, inspect, text
+from db_config import open_engine
+from build_score_cache import build_score_cache, PBP_SCORE_INDEX, PBP_SCORE_INDEX_NAME
+from logger_config import setup_logger
+
+# CONFIG
+DB_URL = 'sqlite:///nba_analysis.db'
+SCORE_COLUMNS = ['score_home', 'score_away']
+
+def migrate_pbp_scores():
+    """
+    One-off upgrade for databases created while play_by_play.score_home /
+    score_away were text columns: converts them to INTEGER in place ('' -> NULL),
+    so the score queries stop comparing strings and the table gets smaller.
+    Safe to run more than once; already-converted columns are left alone.
+    """
+    engine = open_engine(DB_URL)
+    logging.info(f"Connecting to {DB_URL}...")
+
+    if not inspect(engine).has_table('play_by_play'):
+        logging.info("No play_by_play table yet. Nothing to migrate.")
+        return
+
+    types = {c['name']: c['type'] for c in inspect(engine).get_columns('play_by_play')}
+    todo = [c for c in SCORE_COLUMNS if c in types and not isinstance(types[c], Integer)]
+    if not todo:
+        logging.info("play_by_play scores are already INTEGER. Nothing to do.")
+        return
+
+    # The covering score index includes both columns, so it has to go while
+    # they're swapped out. Everything runs in one transaction, so a failure
+    # leaves the table as it was. (SQLite's driver only starts a transaction
+    # before DML, so it's started explicitly to cover the ALTERs as well.)
+    logging.info(f"Converting {', '.join(todo)} to INTEGER...")
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql("BEGIN")
+
+        conn.execute(text(f"DROP INDEX IF EXISTS {PBP_SCORE_INDEX_NAME}"))
+        for col in todo:
+            # Left behind by an interrupted run of an older version of this script
+            if f"{col}_int" in types:
+                conn.execute(text(f"ALTER TABLE play_by_play DROP COLUMN {col}_int"))
+            conn.execute(text(f"ALTER TABLE play_by_play ADD COLUMN {col}_int INTEGER"))
+            conn.execute(text(f"UPDATE play_by_play SET {col}_int = CAST(NULLIF({col}, '') AS INTEGER)"))
+            conn.execute(text(f"ALTER TABLE play_by_play DROP COLUMN {col}"))
+            conn.execute(text(f"ALTER TABLE play_by_play RENAME COLUMN {col}_int TO {col}"))
+        conn.execute(text(PBP_SCORE_INDEX))
+
+    # The cache was built from the text scores; rebuild it from the new columns
+    build_score_cache(engine)
+
+    if engine.dialect.name == 'sqlite':
+        # Hand the space freed by the shorter rows back to the filesystem
+        logging.info("Compacting the database file (VACUUM)...")
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text("VACUUM"))
+
+    logging.info("play_by_play scores migrated to INTEGER.")
+
+if __name__ == "__main__":
+    setup_logger()
+    logging.info("--- Running migrate_pbp_scores script ---")
+    migrate_pbp_scores()
+    logging.info("--- migrate_pbp_scores script finished ---")
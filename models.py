@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, String, Float, Date, Boolean, ForeignKey, Index, inspect
+from db_config import open_engine
+from build_score_cache import PBP_SCORE_INDEX_NAME
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -42,7 +44,7 @@ class Game(Base):
     __tablename__ = 'games'
     game_id = Column(String(20), primary_key=True)
     game_date = Column(Date)
-    season_id = Column(String(10))
+    season_id = Column(String(10), index=True)
     matchup = Column(String(50))
     
     home_team_id = Column(Integer, ForeignKey('teams.team_id'))
@@ -111,8 +113,15 @@ class PlayByPlay(Base):
     loc_x = Column(Integer)
     loc_y = Column(Integer)
     margin = Column(Integer)
-    score_home = Column(String(10))
-    score_away = Column(String(10))
+    # Running score; NULL on events that don't carry one. (Databases created
+    # when these were text columns: see migrate_pbp_scores.py.)
+    score_home = Column(Integer)
+    score_away = Column(Integer)
+
+    # Covering index for the Q3/Final score lookup (see build_score_cache)
+    __table_args__ = (
+        Index(PBP_SCORE_INDEX_NAME, 'game_id', 'period', event_num.desc(), 'score_home', 'score_away'),
+    )
 
 class HustleStats(Base):
     """
@@ -155,7 +164,8 @@ class GameRotation(Base):
     row_id = Column(Integer, primary_key=True, autoincrement=True) 
     
     # game_id is now just a Foreign Key, not part of the Primary Key
-    game_id = Column(String(20), ForeignKey('games.game_id'))
+    # (indexed on its own, so re-ingesting a game doesn't scan every rotation)
+    game_id = Column(String(20), ForeignKey('games.game_id'), index=True)
     
     player_id = Column(Integer, ForeignKey('players.player_id'))
     team_id = Column(Integer, ForeignKey('teams.team_id'))
@@ -186,9 +196,21 @@ class PlayerMatchups(Base):
 # ==========================================
 
 def init_db(db_url):
-    engine = create_engine(db_url)
+    engine = open_engine(db_url)
     Base.metadata.create_all(engine)
     print(f"✅ Platinum Schema created at: {db_url}")
 
+def ensure_indexes(engine):
+    """
+    Creates the indexes declared above that an existing database is missing.
+    create_all() only builds indexes together with a new table, so databases
+    created before an index was added would never get it otherwise.
+    """
+    existing = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(engine, checkfirst=True)
+
 if __name__ == "__main__":
     init_db('sqlite:///nba_analysis.db')
\ No newline at end of file
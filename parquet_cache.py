@@ -0,0 +1,90 @@
+import os
+import re
+import time
+import functools
+from datetime import datetime, timezone
+import pandas as pd
+from sqlalchemy.engine import make_url
+from db_config import open_engine
+
+# CONFIG
+CACHE_DIR = 'cache'
+
+def cache_path(key):
+    """cache/<key>.parquet, with the key squashed into a safe file name."""
+    return os.path.join(CACHE_DIR, re.sub(r'[\W_]+', '_', key).strip('_') + '.parquet')
+
+def db_modified_time(db_url, db_path):
+    """
+    When the SQLite database's contents last changed, or None if that can't be
+    told right now. With WAL, commits sit in the -wal file until a checkpoint,
+    and that file is (re)created by any connection, even one that only reads,
+    so its mtime says nothing. The WAL is checkpointed into the main file first
+    instead: that file is only written when pages actually change.
+    """
+    with open_engine(db_url).connect() as conn:
+        # PASSIVE never waits on other connections; it reports how many WAL
+        # frames there are and how many it copied back. Any left over (e.g. a
+        # running ingest holds them) means newer commits aren't in the file yet.
+        busy, wal_frames, copied = conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    return None if busy or copied != wal_frames else os.path.getmtime(db_path)
+
+def parquet_cache(key, db_url):
+    """
+    Caches the DataFrame returned by the wrapped function to cache/<key>.parquet.
+    The cached file is reused until the SQLite database's contents change
+    (e.g. by an ingest run), at which point it is rebuilt on the next call.
+    Connections that only read don't count (see db_modified_time).
+    Files are zstd-compressed: smaller than the default snappy and still
+    decoded faster than re-running the SQL.
+    """
+    path = cache_path(key)
+    db_path = make_url(db_url).database
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Only file-based (SQLite) databases have an mtime we can key on
+            if not db_path or not os.path.exists(db_path):
+                return func(*args, **kwargs)
+
+            db_mtime = db_modified_time(db_url, db_path)
+            if db_mtime is not None and os.path.exists(path) and os.path.getmtime(path) >= db_mtime:
+                print(f"   Loading cached data from {path}...")
+                return pd.read_parquet(path, engine='pyarrow')
+
+            df = func(*args, **kwargs)
+            if not df.empty:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+            return df
+        return wrapper
+    return decorator
+
+def daily_api_cache(name, max_age=None):
+    """
+    Caches the DataFrame returned by an NBA API call per UTC day, keyed on the
+    call's arguments (cache/<name>_<args>_<date>.parquet). Schedules and game
+    lists only change day to day, so re-running a script on the same day skips
+    the slow, rate-limited request entirely. Empty responses are not cached.
+    With max_age (seconds), a file older than that is refetched even on the
+    same day, for data that changes as games finish. Pass refresh=True to
+    skip the cached file and overwrite it with a fresh response.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, refresh=False):
+            today = datetime.now(timezone.utc).date().isoformat()
+            path = cache_path('_'.join([name, *map(str, args), today]))
+            fresh = os.path.exists(path) and (max_age is None or time.time() - os.path.getmtime(path) < max_age)
+            if fresh and not refresh:
+                print(f"   Loading today's cached API response from {path}...")
+                return pd.read_parquet(path, engine='pyarrow')
+
+            df = func(*args)
+            if not df.empty:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                df.to_parquet(path, engine='pyarrow', compression='zstd', index=False)
+            return df
+        return wrapper
+    return decorator
@@ -1,71 +1,57 @@
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sqlalchemy import create_engine
+from db_config import open_engine
+from build_score_cache import ensure_score_cache
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 
 def plot_closing_scatter():
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     print("--- 🔍 VISUAL DATA INSPECTION ---")
     
     # 1. FETCH SCORES (Not Margin)
-    # We grab the raw score strings ("105") and cast them to integers later
-    print("   Fetching raw scores from PlayByPlay...")
+    # The Q3 / final snapshots come from the game_q3_final_scores cache: one
+    # ROW_NUMBER() pass over play_by_play (served by a covering index), built
+    # once by build_score_cache instead of two GROUP BY scans on every run.
+    # Older databases store the scores as strings ("105"), so SQLite casts them
+    print("   Fetching raw scores from the Q3/Final score cache...")
     query = """
-    WITH q3_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 3 
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    ),
-    final_scores AS (
-        SELECT game_id, score_home, score_away
-        FROM play_by_play
-        WHERE period = 4
-        GROUP BY game_id HAVING event_num = MAX(event_num)
-    )
     SELECT 
         g.game_id,
         t_home.abbreviation as home_team,
         t_away.abbreviation as away_team,
-        q3.score_home as q3_home,
-        q3.score_away as q3_away,
-        final.score_home as f_home,
-        final.score_away as f_away
+        CAST(s.q3_h AS INTEGER) as q3_home,
+        CAST(s.q3_a AS INTEGER) as q3_away,
+        CAST(s.f_h AS INTEGER) as f_home,
+        CAST(s.f_a AS INTEGER) as f_away
     FROM games g
-    JOIN q3_scores q3 ON g.game_id = q3.game_id
-    JOIN final_scores final ON g.game_id = final.game_id
+    JOIN game_q3_final_scores s ON g.game_id = s.game_id
     JOIN teams t_home ON g.home_team_id = t_home.team_id
     JOIN teams t_away ON g.away_team_id = t_away.team_id
     """
     
     try:
+        ensure_score_cache(engine)
         raw_df = pd.read_sql(query, engine)
         
         # 2. CALCULATE TRUE MARGINS
-        # Convert strings to integers and calculate: (Home - Away)
-        cols = ['q3_home', 'q3_away', 'f_home', 'f_away']
-        for c in cols:
-            raw_df[c] = pd.to_numeric(raw_df[c])
-            
+        # The scores arrive as integers already, so this is just: (Home - Away)
         raw_df['Q3_Margin_Home'] = raw_df['q3_home'] - raw_df['q3_away']
         raw_df['Final_Margin_Home'] = raw_df['f_home'] - raw_df['f_away']
         
         # 3. STACK DATA (Home & Away Perspectives)
-        # Home Perspective
-        home_df = raw_df[['home_team', 'Q3_Margin_Home', 'Final_Margin_Home']].copy()
-        home_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
-        
-        # Away Perspective (Flip the signs!)
-        away_df = raw_df[['away_team', 'Q3_Margin_Home', 'Final_Margin_Home']].copy()
-        away_df['Q3_Lead'] = away_df['Q3_Margin_Home'] * -1
-        away_df['Final_Result'] = away_df['Final_Margin_Home'] * -1
-        away_df = away_df[['away_team', 'Q3_Lead', 'Final_Result']]
-        away_df.columns = ['Team', 'Q3_Lead', 'Final_Result']
-        
-        full_df = pd.concat([home_df, away_df], ignore_index=True)
+        # Home rows first, then the away rows with the signs flipped, built
+        # straight from the arrays: one DataFrame, no intermediate copies
+        q3 = raw_df['Q3_Margin_Home'].to_numpy()
+        final = raw_df['Final_Margin_Home'].to_numpy()
+        full_df = pd.DataFrame({
+            'Team': np.concatenate([raw_df['home_team'].to_numpy(), raw_df['away_team'].to_numpy()]),
+            'Q3_Lead': np.concatenate([q3, -q3]),
+            'Final_Result': np.concatenate([final, -final]),
+        })
         
         print(f"   Plotting {len(full_df)} data points...")
         
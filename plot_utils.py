@@ -0,0 +1,20 @@
+import numpy as np
+
+def annotated_heatmap(ax, data, fmt=".1f", cmap="RdYlGn"):
+    """
+    Draws a DataFrame as a heatmap centred on 0 with each cell's value written
+    in it (the look of sns.heatmap(annot=True, center=0)), using only
+    matplotlib: one pcolormesh plus a text label per cell.
+    """
+    values = data.to_numpy(dtype=float)
+    limit = np.nanmax(np.abs(values)) or 1.0
+
+    mesh = ax.pcolormesh(values, cmap=cmap, vmin=-limit, vmax=limit, edgecolors='white', linewidth=0.5)
+    for i, j in np.ndindex(values.shape):
+        ax.text(j + 0.5, i + 0.5, format(values[i, j], fmt), ha='center', va='center')
+
+    ax.set_xticks(np.arange(values.shape[1]) + 0.5, labels=data.columns)
+    ax.set_yticks(np.arange(values.shape[0]) + 0.5, labels=data.index)
+    ax.invert_yaxis()  # First row at the top, like a table
+    ax.figure.colorbar(mesh, ax=ax)
+    return mesh
@@ -1,15 +1,42 @@
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import inspect, text
+from db_config import open_engine
 from nba_api.stats.static import players, teams
-from models import Player, Team
+from models import Base, Player, Team
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 
+def upsert(conn, table, df, key):
+    """
+    Inserts df's rows into table in one executemany, updating the rows whose
+    key already exists. Unlike to_sql(if_exists='replace') this keeps the
+    models.py schema (keys, types), and unlike INSERT OR REPLACE it leaves the
+    columns df doesn't have (e.g. a player's bio) as they were.
+    """
+    cols = list(df.columns)
+    updates = ', '.join(f"{c} = excluded.{c}" for c in cols if c != key)
+    conn.execute(text(
+        f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(':' + c for c in cols)}) "
+        f"ON CONFLICT ({key}) DO UPDATE SET {updates}"
+    ), df.to_dict('records'))
+
 def populate_dimensions():
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     print(f"🔌 Connecting to {DB_URL}...")
     
+    # Make sure both tables exist with the proper schema
+    Base.metadata.create_all(engine, tables=[Team.__table__, Player.__table__])
+
+    # Tables created by an older version of this script have no primary key,
+    # which the upsert below needs (ON CONFLICT would fail on them)
+    inspector = inspect(engine)
+    for table in ('teams', 'players'):
+        if not inspector.get_pk_constraint(table)['constrained_columns']:
+            print(f"❌ Error: Table '{table}' has no primary key (it predates the current schema).")
+            print("   Run 'reset_dimensions.py' once to rebuild it, then run this script again.")
+            return
+    
     # --- 1. POPULATE TEAMS ---
     print("🏀 Populating Teams...")
     nba_teams = teams.get_teams()
@@ -26,10 +53,6 @@ def populate_dimensions():
         'full_name': 'nickname' # We use the full name (Atlanta Hawks) as the primary name
     })
     
-    # Save to SQL
-    df_teams.to_sql('teams', engine, if_exists='replace', index=False)
-    print(f"   ✅ Added {len(df_teams)} teams.")
-
     # --- 2. POPULATE PLAYERS ---
     print("👤 Populating Players (History & Active)...")
     nba_players = players.get_players()
@@ -43,8 +66,11 @@ def populate_dimensions():
         'id': 'player_id'
     })
     
-    # Save to SQL
-    df_players.to_sql('players', engine, if_exists='replace', index=False)
+    # Save to SQL: both tables in a single transaction (one commit)
+    with engine.begin() as conn:
+        upsert(conn, 'teams', df_teams, 'team_id')
+        upsert(conn, 'players', df_players, 'player_id')
+    print(f"   ✅ Added {len(df_teams)} teams.")
     print(f"   ✅ Added {len(df_players)} players.")
     
     print("\n🎉 Dimensions populated! Run 'check_db.py' again to see the report.")
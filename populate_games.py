@@ -1,51 +1,49 @@
 import pandas as pd
-from sqlalchemy import create_engine
-from nba_api.stats.endpoints import leaguegamefinder
+from db_config import open_engine
+from get_nba_data import fetch_season_games
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 TARGET_SEASON = '2024-25'
 
 def populate_games_table():
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     print(f"📅 Fetching {TARGET_SEASON} schedule from NBA API...")
     
     # 1. Fetch all games for the season
-    finder = leaguegamefinder.LeagueGameFinder(
-        league_id_nullable='00',
-        season_nullable=TARGET_SEASON,
-        season_type_nullable='Regular Season'
-    )
-    all_games = finder.get_data_frames()[0]
+    # (shared with the ingest scripts: rate-limited, retried, and cached on
+    # disk, so a rerun soon after one of them skips the download entirely)
+    all_games = fetch_season_games(TARGET_SEASON, 'Regular Season')
     
     # 2. Split into Home and Away rows
-    # The API returns 2 rows per game. We split them to join them back together.
-    # "vs." implies Home, "@" implies Away.
-    home_rows = all_games[all_games['MATCHUP'].str.contains('vs.')].copy()
-    away_rows = all_games[all_games['MATCHUP'].str.contains('@')].copy()
+    # The API returns 2 rows per game: "vs." implies Home, "@" implies Away.
+    # One plain-substring pass over MATCHUP decides the side of every row.
+    is_home = all_games['MATCHUP'].str.contains('vs.', regex=False).to_numpy()
+    away_rows = all_games.loc[~is_home, ['GAME_ID', 'TEAM_ID', 'PTS']].set_index('GAME_ID')
     
-    print(f"   Found {len(home_rows)} unique games.")
+    # 3. Pair every home row with its opponent
+    # Keep only games with both sides (as an inner join would), then look the
+    # away side up by GAME_ID: an index lookup instead of a full merge, and
+    # reindex refuses duplicate GAME_IDs rather than silently doubling a game
+    home_rows = all_games[is_home]
+    home_rows = home_rows[home_rows['GAME_ID'].isin(away_rows.index)]
+    away_rows = away_rows.reindex(home_rows['GAME_ID'])
     
-    # 3. Join on GAME_ID to get both Team IDs in one row
-    # This ensures we get the correct Home_Team_ID and Away_Team_ID
-    merged_games = pd.merge(
-        home_rows, 
-        away_rows[['GAME_ID', 'TEAM_ID', 'PTS']], 
-        on='GAME_ID', 
-        suffixes=('_home', '_away')
-    )
+    print(f"   Found {len(home_rows)} unique games.")
     
     # 4. Format for Database
     # We select and rename columns to match models.py
+    # GAME_DATE already comes as 'YYYY-MM-DD', which is exactly how a Date
+    # column is stored in SQLite, so it goes in as-is (no per-row date objects)
     db_data = pd.DataFrame({
-        'game_id': merged_games['GAME_ID'],
-        'game_date': pd.to_datetime(merged_games['GAME_DATE']).dt.date,
-        'season_id': merged_games['SEASON_ID'],
-        'matchup': merged_games['MATCHUP'],
-        'home_team_id': merged_games['TEAM_ID_home'],
-        'away_team_id': merged_games['TEAM_ID_away'],
-        'home_pts': merged_games['PTS_home'],
-        'away_pts': merged_games['PTS_away']
+        'game_id': home_rows['GAME_ID'].to_numpy(),
+        'game_date': home_rows['GAME_DATE'].to_numpy(),
+        'season_id': home_rows['SEASON_ID'].to_numpy(),
+        'matchup': home_rows['MATCHUP'].to_numpy(),
+        'home_team_id': home_rows['TEAM_ID'].to_numpy(),
+        'away_team_id': away_rows['TEAM_ID'].to_numpy(),
+        'home_pts': home_rows['PTS'].to_numpy(),
+        'away_pts': away_rows['PTS'].to_numpy()
     })
     
     # 5. Save to SQL
@@ -0,0 +1,93 @@
+import functools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from requests.exceptions import ReadTimeout, ConnectionError, JSONDecodeError
+
+# CONFIG
+MAX_CALLS = 3      # stats.nba.com starts refusing us somewhere above this...
+PERIOD = 1.0       # ...many requests per this many seconds (across all threads)
+MAX_BACKOFF = 600  # Never wait more than 10 minutes between attempts
+
+# What the API throws at us when it is throttling or blocking us
+API_ERRORS = (ReadTimeout, ConnectionError, JSONDecodeError)
+
+class RateLimiter:
+    """
+    Thread-safe sliding-window limiter: at most max_calls acquire()s per period
+    seconds, no matter how many worker threads share it. pause() holds every
+    caller back, e.g. after the API starts timing us out.
+    """
+    def __init__(self, max_calls=MAX_CALLS, period=PERIOD):
+        self.max_calls = max_calls
+        self.period = period
+        self._calls = deque()  # monotonic timestamps of the recent calls
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until another request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+
+                if now >= self._resume_at and len(self._calls) < self.max_calls:
+                    self._calls.append(now)
+                    return
+
+                wait = max(self._resume_at - now,
+                           self.period - (now - self._calls[0]) if self._calls else 0)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Stops every thread from sending requests for the next `seconds`."""
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+# One limiter per process, shared by every script that calls the NBA API
+nba_api_limiter = RateLimiter()
+
+def backoff(attempt, base):
+    """Exponential backoff with jitter: ~base, 2*base, 4*base... seconds (attempt counts from 0)."""
+    return min(MAX_BACKOFF, base * 2 ** attempt) + random.uniform(0, 1)
+
+def reset_api_session():
+    """
+    Drops nba_api's shared requests.Session so the next call opens a fresh
+    connection: once stats.nba.com starts timing a session out, retrying on
+    the same one tends to keep failing.
+    """
+    from nba_api.stats.library.http import NBAStatsHTTP
+    NBAStatsHTTP.set_session(None)  # nba_api lazily creates a new one
+
+def with_retries(attempts=3, base=1.0, retry_on=API_ERRORS, bases=None):
+    """
+    Retries the wrapped API call on retry_on errors with exponential backoff,
+    resetting the HTTP session each time. The wait is applied through
+    nba_api_limiter.pause(), so every thread backs off, not just this one
+    (the wrapped function must call nba_api_limiter.acquire() before requesting).
+    bases maps exception types to their own starting wait, e.g. a long one for
+    the errors that mean we're being blocked; anything else starts at base.
+    The last failure is re-raised.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for attempt in range(attempts):
+                try:
+                    return func(*args, **kwargs)
+                except retry_on as e:
+                    if attempt + 1 == attempts:
+                        raise
+                    first_wait = next((b for exc, b in (bases or {}).items() if isinstance(e, exc)), base)
+                    wait = backoff(attempt, first_wait)
+                    logging.warning(f"{func.__name__}({', '.join(map(repr, args))}) failed (attempt {attempt + 1}/{attempts}: {e!r}). "
+                                    f"Pausing all requests for {wait:.0f}s...")
+                    reset_api_session()
+                    nba_api_limiter.pause(wait)
+        return wrapper
+    return decorator
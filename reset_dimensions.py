@@ -1,28 +1,17 @@
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from db_config import open_engine
 from nba_api.stats.static import players, teams
-from models import init_db
+from models import Base
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 
 def reset_dimensions():
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     print(f"🔌 Connecting to {DB_URL}...")
     
-    # --- 1. DROP BROKEN TABLES ---
-    print("🗑️  Dropping outdated dimension tables...")
-    with engine.connect() as conn:
-        conn.execute(text("DROP TABLE IF EXISTS teams"))
-        conn.execute(text("DROP TABLE IF EXISTS players"))
-        conn.commit()
-
-    # --- 2. RE-INITIALIZE SCHEMA ---
-    print("✨ Re-creating tables with Platinum Schema...")
-    init_db(DB_URL)
-
-    # --- 3. REFILL TEAMS ---
-    print("🏀 Populating Teams...")
+    # --- 1. PREPARE TEAMS ---
     nba_teams = teams.get_teams()
     df_teams = pd.DataFrame(nba_teams)
     
@@ -36,12 +25,7 @@ def reset_dimensions():
         'full_name': 'nickname'
     })
     
-    # Save (using 'append' to respect the new schema structure)
-    df_teams.to_sql('teams', engine, if_exists='append', index=False)
-    print(f"   ✅ Added {len(df_teams)} teams.")
-
-    # --- 4. REFILL PLAYERS ---
-    print("👤 Populating Players...")
+    # --- 2. PREPARE PLAYERS ---
     nba_players = players.get_players()
     df_players = pd.DataFrame(nba_players)
     
@@ -53,7 +37,27 @@ def reset_dimensions():
         'id': 'player_id'
     })
     
-    df_players.to_sql('players', engine, if_exists='append', index=False)
+    # --- 3. DROP, RE-CREATE & REFILL ---
+    # All in one transaction: if anything fails, the old tables are still
+    # there. (SQLite's driver only starts a transaction before INSERTs, so
+    # it's started explicitly to cover the DROPs and CREATEs as well.)
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql("BEGIN")
+
+        print("🗑️  Dropping outdated dimension tables...")
+        conn.execute(text("DROP TABLE IF EXISTS teams"))
+        conn.execute(text("DROP TABLE IF EXISTS players"))
+
+        print("✨ Re-creating tables with Platinum Schema...")
+        Base.metadata.create_all(conn)
+
+        # 'append' to respect the new schema structure
+        print("🏀 Populating Teams...")
+        df_teams.to_sql('teams', conn, if_exists='append', index=False)
+        print("👤 Populating Players...")
+        df_players.to_sql('players', conn, if_exists='append', index=False)
+    print(f"   ✅ Added {len(df_teams)} teams.")
     print(f"   ✅ Added {len(df_players)} players.")
     
     print("\n🎉 Dimensions repaired! You can now run 'audit_schema.py' to confirm.")
@@ -1,10 +1,11 @@
-from sqlalchemy import create_engine, inspect
+from sqlalchemy import inspect
+from db_config import open_engine
 
 # CONFIG
 DB_URL = 'sqlite:///nba_analysis.db'
 
 def verify_table():
-    engine = create_engine(DB_URL)
+    engine = open_engine(DB_URL)
     inspector = inspect(engine)
     
     table_name = 'player_matchups'